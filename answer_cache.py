@@ -0,0 +1,70 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """LRU answer cache matched on question-embedding similarity per (document, model)"""
+
+    def __init__(self, threshold: float = 0.95, ttl: float = 3600.0, max_entries: int = 512):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # entry id -> (group, embedding, answer, stored at), oldest first
+        self._groups = {}              # (fingerprint, model) -> {entry id: embedding}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, entry_id):
+        group, _, _, _ = self._entries.pop(entry_id)
+        members = self._groups[group]
+        del members[entry_id]
+        if not members:
+            del self._groups[group]
+
+    def lookup(self, fingerprint: str, model: str, embedding: np.ndarray):
+        """Cached answer to the most similar earlier question, or None"""
+        with self._lock:
+            members = self._groups.get((fingerprint, model), {})
+            now = time.monotonic()
+            for entry_id in [i for i in members if now - self._entries[i][3] > self.ttl]:
+                self._remove(entry_id)
+            members = self._groups.get((fingerprint, model))
+            if members:
+                ids = list(members)
+                similarities = np.stack([members[i] for i in ids]) @ embedding
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._entries.move_to_end(ids[best])
+                    self.hits += 1
+                    return self._entries[ids[best]][2]
+            self.misses += 1
+            return None
+
+    def store(self, fingerprint: str, model: str, embedding: np.ndarray, answer: str):
+        """Cache an answer, evicting the least recently used entries beyond max_entries"""
+        group = (fingerprint, model)
+        embedding = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (group, embedding, answer, time.monotonic())
+            self._groups.setdefault(group, {})[entry_id] = embedding
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,140 @@
+import time
+
+# Step 3 runs when either side-by-side answer scores below this (cascade off)
+IMPROVEMENT_GATE = 70
+# Request options of the answer (Steps 1 and 2) and improvement (Step 3) calls
+ANSWER_OPTIONS = {"max_tokens": 500, "temperature": 0.7}
+IMPROVEMENT_OPTIONS = {"max_tokens": 600, "temperature": 0.5}
+
+
+def build_answer_prompt(question: str, context: str) -> str:
+    """Answer prompt (question alone when there is no context)"""
+    if not context:
+        return question
+    return f"""Please answer the question based on the following information.
+
+Reference information:
+{context}
+
+Question: {question}
+
+Answer:"""
+
+
+def build_improvement_prompt(question: str, basic_answer: str, context: str, quality_analysis: dict) -> str:
+    """Improvement prompt steered by the quality analysis results"""
+    # Set improvement direction based on quality analysis results
+    improvement_directions = []
+    if quality_analysis['score'] < 60:
+        improvement_directions.append("Provide a more specific and detailed answer")
+    if 'Lacks specific examples' in quality_analysis['issues']:
+        improvement_directions.append("Include specific examples")
+    if 'Too many uncertain expressions' in quality_analysis['issues']:
+        improvement_directions.append("Use confident and clear expressions")
+
+    improvement_text = " ".join(improvement_directions) if improvement_directions else "Improve the answer to be more accurate and useful"
+
+    return f"""Please improve the following answer. Improvement direction: {improvement_text}
+
+Original question: {question}
+Context: {context}
+Current answer: {basic_answer}
+
+Improved answer:"""
+
+
+def stream_chat(client, model: str, prompt: str, **options):
+    """Yield text deltas of a streamed OpenAI-compatible chat completion"""
+    stream = client.chat.completions.create(
+        model=model, messages=[{"role": "user", "content": prompt}], stream=True, **options
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def first_steps(use_cascade: bool) -> list:
+    """Steps dispatched up front: GPT-3.5 alone under the cascade, otherwise GPT-3.5 and GPT-4o together"""
+    return ["gpt35"] if use_cascade else ["gpt35", "gpt4o"]
+
+
+def next_steps(finished: str, qualities: dict, use_cascade: bool, threshold: float) -> list:
+    """Steps to dispatch once step `finished` has been scored"""
+    if use_cascade:
+        # Escalate one tier only while quality stays below the threshold
+        if qualities[finished]['score'] < threshold:
+            return {"gpt35": ["gpt4o"], "gpt4o": ["improved"]}.get(finished, [])
+        return []
+    # Step 3 once both side-by-side answers are in and either falls short
+    if finished in ("gpt35", "gpt4o") and "gpt35" in qualities and "gpt4o" in qualities:
+        if qualities["gpt35"]['score'] < IMPROVEMENT_GATE or qualities["gpt4o"]['score'] < IMPROVEMENT_GATE:
+            return ["improved"]
+    return []
+
+
+def improvement_base(qualities: dict) -> str:
+    """Step whose answer Step 3 improves (the better scored one)"""
+    return "gpt4o" if "gpt4o" in qualities and qualities["gpt4o"]['score'] > qualities["gpt35"]['score'] else "gpt35"
+
+
+def answer_fingerprint(document_key: str = None, chunk_ids=(), top_k: int = None) -> str:
+    """Answer cache group: the document, top-k and the retrieved chunks, in prompt order
+
+    Only prompts built from the question and these chunks may be cached (no conversation
+    history), so an answer is reused exactly when its prompt context would be the same.
+    Questions without a document share the "general" group.
+    """
+    if not document_key:
+        return "general"
+    return f"{document_key}:{top_k}:{','.join(map(str, chunk_ids))}"
+
+
+def is_error_answer(answer: str) -> bool:
+    """Whether an answer is an error/unsupported-model message rather than model output"""
+    return not answer or answer.startswith(("Error occurred", "Unsupported model"))
+
+
+def cached_answer_stream(cache, deltas, fingerprint: str, model: str, question_embedding, lookup: dict = None):
+    """Serve a similar earlier answer from the cache, otherwise stream and store the new one"""
+    if cache is None or question_embedding is None:
+        yield from deltas
+        return
+    cached = cache.lookup(fingerprint, model, question_embedding)
+    if lookup is not None:
+        lookup["hit"] = cached is not None
+    if cached is not None:
+        yield cached
+        return
+    parts = []
+    for delta in deltas:
+        parts.append(delta)
+        yield delta
+    answer = "".join(parts)
+    if not is_error_answer(answer):
+        cache.store(fingerprint, model, question_embedding, answer)
+
+
+class AnswerStream:
+    """Collects a streamed answer on a worker thread and times its first token"""
+
+    def __init__(self, deltas):
+        self.text = ""
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+        self._deltas = deltas
+
+    def run(self) -> str:
+        for delta in self._deltas:
+            if delta and self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+            self.text += delta or ""
+        self.finished_at = time.perf_counter()
+        return self.text
+
+    @property
+    def ttft_ms(self):
+        """Time to first token in milliseconds (None until one arrives)"""
+        if self.first_token_at is None:
+            return None
+        return (self.first_token_at - self.started_at) * 1000
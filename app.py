@@ -6,6 +6,8 @@ import numpy as np
 import time
 import re
 
+from retrieval import IVFIndex
+
 # OpenAI API key setup (moved to top)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
@@ -130,6 +132,8 @@ if "docs" not in st.session_state:
 # Session state for multi-PDF memory feature
 if "multiple_pdfs_memory" not in st.session_state:
     st.session_state.multiple_pdfs_memory = {}  # {pdf_name: {"text": text, "chunks": chunks, "embeddings": embeddings}}
+    st.session_state.multi_pdf_index = IVFIndex()  # ANN index over every memorized chunk
+    st.session_state.multi_pdf_chunks = []  # (pdf_name, chunk) per index row
 
 if "history" not in st.session_state:
     st.session_state.history = []
@@ -192,6 +196,40 @@ def get_context(question: str, docs: list, embs: list) -> str:
     
     return "\n\n".join(best_chunks[:3]) if best_chunks else docs[0] if docs else ""
 
+def embed_texts(texts: list, batch_size: int = 256):
+    """Normalized float32 embeddings for texts (None, with a warning, if the API call fails)"""
+    try:
+        vectors = []
+        for i in range(0, len(texts), batch_size):
+            response = client.embeddings.create(model="text-embedding-3-small", input=texts[i:i + batch_size])
+            vectors.extend(embedding_data.embedding for embedding_data in response.data)
+        matrix = np.asarray(vectors, dtype=np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        return matrix
+    except Exception as e:
+        st.warning(f"⚠️ Embedding request failed: {str(e)}")
+        return None
+
+def rebuild_multi_pdf_index():
+    """Rebuild the multi-PDF ANN index from the memorized embeddings"""
+    st.session_state.multi_pdf_index = IVFIndex()
+    st.session_state.multi_pdf_chunks = []
+    for pdf_name, memory_data in st.session_state.multiple_pdfs_memory.items():
+        if memory_data.get("embeddings") is not None:
+            st.session_state.multi_pdf_index.add(memory_data["embeddings"])
+            st.session_state.multi_pdf_chunks.extend((pdf_name, chunk) for chunk in memory_data["chunks"])
+
+def search_multi_pdf(question: str, top_k: int = 5) -> list:
+    """Most relevant (pdf_name, chunk) pairs across memorized PDFs"""
+    index = st.session_state.multi_pdf_index
+    if len(index) == 0:
+        return []
+    query = embed_texts([question])
+    if query is None:
+        return []
+    ids, _ = index.search(query[0], top_k)
+    return [st.session_state.multi_pdf_chunks[i] for i in ids]
+
 def analyze_answer_quality(answer: str, question: str) -> dict:
     """Analyze answer quality"""
     if not answer or len(answer.strip()) < 10:
@@ -521,14 +559,23 @@ with col1:
                         with st.spinner(f"Reading PDF '{uploaded_file.name}'..."):
                             pdf_text = read_pdf(uploaded_file)
                             if pdf_text:
+                                chunks = chunk_text(pdf_text, chunk_size, overlap_size)
+                                embeddings = embed_texts(chunks)
                                 # Save to multi-PDF memory
                                 st.session_state.multiple_pdfs_memory[uploaded_file.name] = {
                                     "text": pdf_text,
-                                    "chunks": chunk_text(pdf_text, chunk_size, overlap_size),
+                                    "chunks": chunks,
+                                    "embeddings": embeddings,
                                     "upload_time": time.strftime("%Y-%m-%d %H:%M:%S"),
                                     "size": len(pdf_text)
                                 }
-                                st.success(f"✅ {uploaded_file.name} uploaded successfully! (Memorized)")
+                                # Incremental insert into the ANN index
+                                if embeddings is not None:
+                                    st.session_state.multi_pdf_index.add(embeddings)
+                                    st.session_state.multi_pdf_chunks.extend((uploaded_file.name, chunk) for chunk in chunks)
+                                    st.success(f"✅ {uploaded_file.name} uploaded successfully! (Memorized)")
+                                else:
+                                    st.warning(f"⚠️ {uploaded_file.name} was memorized without embeddings, so semantic search across PDFs will not find it.")
                     else:
                         st.warning(f"⚠️ {uploaded_file.name} is already uploaded.")
         
@@ -546,6 +593,7 @@ with col1:
                 with col4:
                     if st.button(f"Delete", key=f"delete_memory_{pdf_name}"):
                         del st.session_state.multiple_pdfs_memory[pdf_name]
+                        rebuild_multi_pdf_index()
                         st.success(f"✅ {pdf_name} removed from memory!")
                         st.rerun()
         
@@ -629,8 +677,12 @@ if st.session_state.multiple_pdfs_memory:
                     answer += "\nDifficult to find common topics."
             
             else:
-                # General question
-                context = f"Memorized PDFs:\n{all_pdf_content[:2000]}..."
+                # General question: nearest chunks across all memorized PDFs
+                relevant_chunks = search_multi_pdf(pdf_question)
+                if relevant_chunks:
+                    context = "Memorized PDFs:\n" + "\n\n".join(f"=== {pdf_name} ===\n{chunk}" for pdf_name, chunk in relevant_chunks)
+                else:
+                    context = f"Memorized PDFs:\n{all_pdf_content[:2000]}..."
                 answer = generate_answer(pdf_question, context, "gpt-4o")
             
             # Save conversation history
@@ -670,6 +722,8 @@ if st.session_state.history:
 # Reset button
 if st.button("🗑️ Reset All Data"):
     st.session_state.multiple_pdfs_memory = {}
+    st.session_state.multi_pdf_index = IVFIndex()
+    st.session_state.multi_pdf_chunks = []
     st.session_state.history = []
     st.session_state.docs = None
     st.session_state.embs = None
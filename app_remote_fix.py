@@ -1,11 +1,15 @@
 import streamlit as st
 import openai
-import requests
 import json
 import time
 from typing import Optional
 import os
 
+from embeddings import backoff_delay
+from gpt_oss import GPT_OSS_BASE_URL, build_messages, get_gpt_oss_client
+from health import OPEN, endpoint_key, get_circuit_breaker, get_health_prober
+from llm_clients import get_http_session, get_openai_client
+
 # Page settings
 st.set_page_config(
     page_title="AI PDF Assistant - Fixed GPT-OSS",
@@ -36,61 +40,49 @@ api_keys = load_api_keys()
 # OpenAI client settings
 if 'OPENAI_API_KEY' in api_keys:
     openai.api_key = api_keys['OPENAI_API_KEY']
-    client = openai.OpenAI(api_key=api_keys['OPENAI_API_KEY'])
+    client = get_openai_client(api_keys['OPENAI_API_KEY'])
 else:
     client = None
 
+# GPT-OSS server health: probed in the background; the client's calls go through the endpoint's circuit breaker
+GPT_OSS_URL = endpoint_key(GPT_OSS_BASE_URL)
+gpt_oss_breaker = get_circuit_breaker(GPT_OSS_URL)
+gpt_oss_prober = get_health_prober(f"{GPT_OSS_URL}/health", gpt_oss_breaker, get_http_session("gpt-oss"))
+gpt_oss_client = get_gpt_oss_client()
+
 # Check GPT-OSS server status
 def check_gpt_oss_server():
-    """Checks GPT-OSS server status."""
-    try:
-        response = requests.get("http://localhost:8000/health", timeout=5)
-        return response.status_code == 200
-    except:
-        return False
+    """Checks GPT-OSS server status (cached result of the background health check)."""
+    # Unknown until the first probe completes; the breaker still guards calls
+    return gpt_oss_prober.healthy is not False
 
 # GPT-OSS API call (fixed version)
 def call_gpt_oss_api(prompt: str, model_name: str = "gpt-oss-20b") -> str:
     """Calls GPT-OSS API (stabilized version)."""
     try:
         # Use simple prompt format
-        messages = [
-            {"role": "system", "content": "You are a helpful assistant. Provide clear and detailed answers."},
-            {"role": "user", "content": prompt}
-        ]
+        messages = build_messages(prompt, system="You are a helpful assistant. Provide clear and detailed answers.")
         
-        response = requests.post(
-            "http://localhost:8000/v1/chat/completions",
-            json={
-                "model": model_name,
-                "messages": messages,
-                "max_tokens": 4096,
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "frequency_penalty": 0.1,
-                "presence_penalty": 0.1,
-                "stop": None
-            },
-            timeout=60
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            if result.get('choices') and result['choices'][0].get('message'):
-                content = result['choices'][0]['message']['content'].strip()
-                if content and len(content) > 10:
-                    return content
-                else:
-                    return "Model returned an empty response. Please check server status."
-            else:
-                return "API response format is incorrect."
+        content = gpt_oss_client.chat(
+            messages,
+            model_name,
+            max_tokens=4096,
+            temperature=0.7,
+            top_p=0.9,
+            frequency_penalty=0.1,
+            presence_penalty=0.1
+        ).strip()
+        if content and len(content) > 10:
+            return content
         else:
-            return f"API call failed: {response.status_code} - {response.text}"
+            return "Model returned an empty response. Please check server status."
             
-    except requests.exceptions.Timeout:
+    except openai.APITimeoutError:
         return "Request timed out. Server is not responding."
-    except requests.exceptions.ConnectionError:
+    except openai.APIConnectionError:
         return "Server connection failed. Please check if GPT-OSS server is running."
+    except openai.APIStatusError as e:
+        return f"API call failed: {e.status_code} - {e.message}"
     except Exception as e:
         return f"API call error: {str(e)}"
 
@@ -98,21 +90,24 @@ def call_gpt_oss_api(prompt: str, model_name: str = "gpt-oss-20b") -> str:
 def safe_gpt_oss_call(prompt: str, max_retries: int = 3) -> str:
     """Safe GPT-OSS API call (with retry logic)."""
     for attempt in range(max_retries):
+        # Fail fast while the server is known to be down
+        if gpt_oss_breaker.state == OPEN:
+            return f"GPT-OSS server is unavailable (circuit {gpt_oss_breaker.state}). Please check server status."
         try:
             response = call_gpt_oss_api(prompt)
             
-            # Check if response is valid
+            # Check if response is valid (transport and HTTP errors already reached the breaker inside the client)
             if response and len(response.strip()) > 20 and "error" not in response and "failed" not in response:
                 return response
             else:
                 st.warning(f"Attempt {attempt + 1}: Response is not valid. Retrying...")
                 if attempt < max_retries - 1:
-                    time.sleep(3)
+                    time.sleep(backoff_delay(attempt, base=0.25, cap=1.0))
                     
         except Exception as e:
             st.error(f"Attempt {attempt + 1} failed: {e}")
             if attempt < max_retries - 1:
-                time.sleep(5)
+                time.sleep(backoff_delay(attempt, base=0.25, cap=1.0))
     
     return "Unable to get model response. Please check server status."
 
@@ -156,6 +151,8 @@ def main():
         # Check server status
         if check_gpt_oss_server():
             st.success("✅ GPT-OSS server is running")
+            if gpt_oss_prober.latency_ms is not None:
+                st.caption(f"Health check {gpt_oss_prober.latency_ms:.0f} ms · {gpt_oss_prober.age():.0f}s ago · circuit {gpt_oss_breaker.state}")
         else:
             st.error("❌ GPT-OSS server is not running")
             st.info("💡 Solution:")
@@ -0,0 +1,76 @@
+"""Recall@k / latency benchmark of IVFIndex against exact VectorIndex search.
+
+Usage: python bench_ann.py --rows 100000 --dim 1536 --probes 1 2 4 8 16 32
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from retrieval import IVFIndex, VectorIndex, recall_at_k
+
+
+def make_corpus(rows: int, dim: int, clusters: int, noise: float, rng) -> np.ndarray:
+    """Normalized vectors drawn around random cluster centres (topic-like structure)"""
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, rows)] + noise * rng.standard_normal((rows, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def mean_latency_ms(index, queries: np.ndarray, k: int) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        index.search(query, k)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.6)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--lists", type=int, default=None, help="IVF lists (default ~sqrt(rows))")
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--insert-batch", type=int, default=5000, help="Rows per incremental insert")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    corpus = make_corpus(args.rows, args.dim, args.clusters, args.noise, rng)
+    queries = corpus[rng.integers(0, args.rows, args.queries)]
+    queries = queries + 0.3 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    exact = VectorIndex(corpus, "float32")
+    start = time.perf_counter()
+    ivf = IVFIndex(n_lists=args.lists, seed=args.seed)
+    for offset in range(0, args.rows, args.insert_batch):
+        ivf.add(corpus[offset:offset + args.insert_batch])
+    build_seconds = time.perf_counter() - start
+
+    report = {
+        "rows": args.rows,
+        "dim": args.dim,
+        "k": args.k,
+        "lists": len(ivf.centroids) if ivf.centroids is not None else 0,
+        "build_seconds": round(build_seconds, 3),
+        "exact_ms": round(mean_latency_ms(exact, queries, args.k), 3),
+        "ivf": [],
+    }
+    for n_probe in args.probes:
+        ivf.n_probe = n_probe
+        report["ivf"].append({
+            "n_probe": n_probe,
+            f"recall@{args.k}": round(recall_at_k(ivf, exact, queries, args.k), 4),
+            "latency_ms": round(mean_latency_ms(ivf, queries, args.k), 3),
+        })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
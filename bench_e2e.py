@@ -0,0 +1,365 @@
+"""End-to-end benchmark: synthetic PDF -> ingest -> retrieve -> answer, against a fake model server.
+
+Ingestion runs through IngestJob with an EmbeddingCache, as in pdf_app (cold, then warm cache).
+Answers go through answer_pipeline: the app's prompts and request options, the quality-gated
+cascade (or Step 3 below its gate with --no-cascade) and the semantic answer cache. Not
+measured: Streamlit rendering, conversation history in the prompt context, per-stage tracing
+and the non-OpenAI models (GPT-OSS, Claude, Gemini).
+
+--gpt-oss instead checks GptOssClient against the mock: chat, stream and chat_many answer,
+every request carries the reasoning level, and its circuit breaker opens on a failing
+server and then stops calling it. Exits with status 1 if any check fails.
+
+Usage: python bench_e2e.py --pages 50 --questions 20 --concurrency 4 > bench.json
+       python bench_e2e.py --gpt-oss > gpt_oss_check.json
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+from fpdf import FPDF
+
+from answer_cache import SemanticAnswerCache
+from answer_pipeline import (
+    ANSWER_OPTIONS, IMPROVEMENT_OPTIONS, AnswerStream, answer_fingerprint, build_answer_prompt, build_improvement_prompt,
+    cached_answer_stream, first_steps, improvement_base, next_steps, stream_chat,
+)
+from embeddings import EmbeddingCache, build_embedding_matrix, make_token_counter
+from gpt_oss import REASONING_LEVELS, GptOssClient, build_messages
+from health import OPEN, CircuitBreaker, CircuitOpenError
+from llm_clients import get_openai_client
+from mock_llm_server import MockConfig, start_mock_server
+from pdf_ingest import IngestJob, chunk_text, read_pdf
+from retrieval import BM25Index, VectorIndex, hybrid_search
+from text_analysis import AnalyzedText, analyze_answer_quality
+
+# Peak RSS (Unix only; reported as None elsewhere)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+STEP_MODELS = {"gpt35": "gpt-3.5-turbo", "gpt4o": "gpt-4o", "improved": "gpt-4o"}
+CACHE_MODELS = {"gpt35": "gpt-3.5-turbo", "gpt4o": "gpt-4o", "improved": "gpt-4o (improved)"}  # As keyed by the app
+TOPICS = ["derivative", "integral", "matrix", "vector", "probability", "variance", "gradient", "entropy",
+          "eigenvalue", "regression", "theorem", "proof", "limit", "series", "function", "network"]
+FILLER = ["the", "of", "and", "a", "to", "in", "is", "that", "for", "it", "as", "with", "on", "by", "this",
+          "we", "can", "from", "which", "be", "an", "are", "model", "value", "result", "method", "data", "case"]
+
+
+def make_pdf(pages: int, words_per_page: int, rng) -> bytes:
+    """PDF of pages of random sentences mixing filler and topic words"""
+    vocabulary = np.array(FILLER * 3 + TOPICS)
+    pdf = FPDF()
+    pdf.set_font("Helvetica", size=10)
+    for _ in range(pages):
+        pdf.add_page()
+        words = rng.choice(vocabulary, words_per_page)
+        sentences = [" ".join(words[i:i + 12]).capitalize() + "." for i in range(0, words_per_page, 12)]
+        pdf.multi_cell(0, 5, " ".join(sentences))
+    output = pdf.output(dest="S")  # str in fpdf 1.x, bytearray in fpdf2
+    return output.encode("latin-1") if isinstance(output, str) else bytes(output)
+
+
+def latency_stats(samples_ms: list) -> dict:
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "runs": len(samples),
+        "mean_ms": round(float(samples.mean()), 2),
+        "p50_ms": round(float(np.percentile(samples, 50)), 2),
+        "p95_ms": round(float(np.percentile(samples, 95)), 2),
+        "p99_ms": round(float(np.percentile(samples, 99)), 2),
+    }
+
+
+def timed(fn, *args, repeats: int = 1):
+    """(last result, per-run latencies in ms)"""
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return result, latencies
+
+
+def peak_mib(fn, *args) -> float:
+    """Peak Python heap (including numpy buffers) allocated during one call"""
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+    finally:
+        tracemalloc.stop()
+
+
+def make_embedder(client, cache: EmbeddingCache):
+    """The app's embed_batch (cache misses only hit the API) and its memoized query embedding"""
+    def embed_batch(batch: list) -> np.ndarray:
+        def fetch(missing: list) -> list:
+            response = client.embeddings.create(model=EMBEDDING_MODEL, input=missing)
+            return [embedding_data.embedding for embedding_data in response.data]
+        return build_embedding_matrix(cache.get_or_fetch(EMBEDDING_MODEL, batch, fetch))
+
+    @functools.lru_cache(maxsize=32)
+    def embed_query(question: str) -> np.ndarray:
+        query = np.asarray(client.embeddings.create(model=EMBEDDING_MODEL, input=question).data[0].embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    return embed_batch, embed_query
+
+
+def ingest(data: bytes, embed_batch, count_tokens, args) -> IngestJob:
+    """One finished IngestJob with the app's batching settings"""
+    job = IngestJob(
+        "bench", data, embed_batch, args.chunk_size, args.overlap,
+        max_batch_tokens=args.batch_tokens, max_batch_items=args.batch_items,
+        count_tokens=count_tokens, concurrency=args.embedding_concurrency
+    ).start()
+    job.wait()
+    if job.error is not None:
+        raise job.error
+    return job
+
+
+def answer_question(client, model_pool, answer_cache, question: str, docs: list, vectors, lexical, embed_query,
+                    top_k: int, use_cascade: bool, threshold: float) -> dict:
+    """The app's 3-step pipeline for one question"""
+    start = time.perf_counter()
+    retrieval = hybrid_search(question, docs, vectors, lexical, embed_query, top_k=top_k)
+    context = "\n\n".join(hit["text"] for hit in retrieval["results"])
+    fingerprint = answer_fingerprint("bench", [hit["index"] for hit in retrieval["results"]], top_k)
+    question_embedding = embed_query(question) if answer_cache is not None else None
+    analyzed_question = AnalyzedText(question)
+    streams, futures, answers, qualities, lookups = {}, {}, {}, {}, {}
+
+    def dispatch(step: str):
+        if step == "improved":
+            base = improvement_base(qualities)
+            prompt = build_improvement_prompt(question, answers[base], context, qualities[base])
+            deltas = stream_chat(client, STEP_MODELS[step], prompt, **IMPROVEMENT_OPTIONS)
+        else:
+            deltas = stream_chat(client, STEP_MODELS[step], build_answer_prompt(question, context), **ANSWER_OPTIONS)
+        lookups[step] = {}
+        streams[step] = AnswerStream(cached_answer_stream(
+            answer_cache, deltas, fingerprint, CACHE_MODELS[step], question_embedding, lookups[step]
+        ))
+        futures[model_pool.submit(streams[step].run)] = step
+
+    for step in first_steps(use_cascade):
+        dispatch(step)
+    while futures:
+        finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for future in finished:
+            step = futures.pop(future)
+            answers[step] = future.result()
+            qualities[step] = analyze_answer_quality(AnalyzedText(answers[step]), analyzed_question)
+            for next_step in next_steps(step, qualities, use_cascade, threshold):
+                dispatch(next_step)
+
+    return {
+        "total_ms": (time.perf_counter() - start) * 1000,
+        "retrieval_ms": sum(retrieval["timings"].values()),
+        "ttft_ms": [stream.ttft_ms for stream in streams.values() if stream.ttft_ms is not None],
+        "tier": "improved" if "improved" in answers else "gpt4o" if "gpt4o" in answers else "gpt35",
+        "calls": len(answers),
+        "cache_hits": sum(bool(lookup.get("hit")) for lookup in lookups.values()),
+    }
+
+
+def check_gpt_oss(args) -> dict:
+    """GptOssClient checks against the mock server (see the module docstring)"""
+    server = start_mock_server(config=MockConfig(seed=args.seed, ttft_ms=args.ttft_ms, token_ms=args.token_ms))
+    conversations = [build_messages(f"What is a {topic}?", f"A {topic} is discussed in the notes.") for topic in TOPICS[:8]]
+    checks, latencies = {}, {}
+    try:
+        for reasoning in REASONING_LEVELS:
+            client = GptOssClient(server.base_url, "mock", reasoning, CircuitBreaker("gpt-oss-check"), max_in_flight=4)
+            answer, latencies[f"chat_{reasoning}"] = timed(client.chat, conversations[0], "gpt-oss-20b", 100)
+            checks[f"chat_{reasoning}"] = bool(answer)
+        stream = AnswerStream(client.stream(conversations[0], "gpt-oss-20b", 100))
+        checks["stream"] = stream.run() == answer  # Same deterministic answer, streamed
+        answers, latencies["chat_many"] = timed(functools.partial(client.chat_many, max_tokens=100), conversations, "gpt-oss-20b")
+        checks["chat_many"] = len(answers) == len(conversations) and all(answers) and len(set(answers)) == len(answers)
+        # One chat per level, then the stream and chat_many requests at the last level
+        expected = {f"reasoning_{level}": 1 for level in REASONING_LEVELS}
+        expected[f"reasoning_{reasoning}"] += 1 + len(conversations)
+        stats = dict(server.stats)
+        checks["reasoning_forwarded"] = all(stats.get(key) == count for key, count in expected.items()) \
+            and stats["chat"] + stats["stream"] == sum(expected.values())
+    finally:
+        server.shutdown()
+
+    # Every request fails: the breaker opens after its threshold and later calls never reach the server
+    failing = start_mock_server(config=MockConfig(seed=args.seed, ttft_ms=0, error_500=1.0))
+    try:
+        breaker = CircuitBreaker("gpt-oss-failing", failure_threshold=3, reset_timeout=60)
+        client = GptOssClient(failing.base_url, "mock", breaker=breaker)
+        errors = []
+        for _ in range(breaker.failure_threshold + 2):
+            try:
+                client.chat(conversations[0], max_tokens=10)
+                errors.append(None)
+            except Exception as e:
+                errors.append(type(e).__name__)
+        checks["breaker_opens"] = breaker.state == OPEN and failing.stats["500"] == breaker.failure_threshold
+        checks["breaker_fails_fast"] = errors[breaker.failure_threshold:] == [CircuitOpenError.__name__] * 2
+    finally:
+        failing.shutdown()
+
+    return {
+        "config": {"seed": args.seed, "ttft_ms": args.ttft_ms, "token_ms": args.token_ms},
+        "checks": checks,
+        "passed": all(checks.values()),
+        "latency_ms": {name: round(samples[0], 2) for name, samples in latencies.items()},
+        "stream_ttft_ms": round(stream.ttft_ms, 2) if stream.ttft_ms is not None else None,
+        "mock_server": stats,
+        "failing_server_errors": errors,
+    }
+
+
+def peak_rss_mib():
+    """Peak resident set size of this process (None where the resource module is unavailable)"""
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=5, help="Runs of the read/chunk/ingest stages")
+    parser.add_argument("--batch-tokens", type=int, default=int(os.getenv("EMBEDDING_BATCH_TOKENS", "50000")))
+    parser.add_argument("--batch-items", type=int, default=2048)
+    parser.add_argument("--embedding-concurrency", type=int, default=int(os.getenv("EMBEDDING_CONCURRENCY", "4")))
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4, help="Questions answered at once")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--precision", default=os.getenv("EMBEDDING_PRECISION", "int8"), help="VectorIndex precision")
+    parser.add_argument("--quality-threshold", type=float, default=60, help="Cascade quality threshold (app default)")
+    parser.add_argument("--no-cascade", action="store_true", help="Run GPT-3.5 and GPT-4o side by side, Step 3 below its gate")
+    parser.add_argument("--no-answer-cache", action="store_true", help="Skip the semantic answer cache")
+    parser.add_argument("--base-url", default=None, help="Existing OpenAI-compatible server (default: start the mock)")
+    parser.add_argument("--ttft-ms", type=float, default=100.0, help="Mock median time to first token")
+    parser.add_argument("--token-ms", type=float, default=5.0, help="Mock median gap between tokens")
+    parser.add_argument("--embed-ms", type=float, default=20.0, help="Mock median embeddings request overhead")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gpt-oss", action="store_true", help="Check GptOssClient against the mock instead (see above)")
+    args = parser.parse_args()
+
+    if args.gpt_oss:
+        report = check_gpt_oss(args)
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if report["passed"] else 1)
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = start_mock_server(config=MockConfig(
+            seed=args.seed, ttft_ms=args.ttft_ms, token_ms=args.token_ms, embed_ms=args.embed_ms
+        ))
+        base_url = server.base_url
+    client = get_openai_client("mock", base_url)
+    count_tokens = make_token_counter(EMBEDDING_MODEL)
+    answer_cache = None if args.no_answer_cache else SemanticAnswerCache(
+        float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")), float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+        int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+    )
+
+    rng = np.random.default_rng(args.seed)
+    data = make_pdf(args.pages, args.words_per_page, rng)
+    questions = [f"What does the document say about {a} and {b}?" for a, b in rng.choice(TOPICS, (args.questions, 2))]
+
+    pdf_pages, read_ms = timed(read_pdf, data, repeats=args.repeats)
+    docs, chunk_ms = timed(chunk_text, pdf_pages.text, args.chunk_size, args.overlap, repeats=args.repeats)
+    tokens = sum(map(count_tokens, docs))
+
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as cache_dir:
+        # Cold: every run starts from an empty embedding cache; warm: the last run's cache again
+        cold_ms, embed_rates = [], []
+        for run in range(args.repeats):
+            embed_batch, embed_query = make_embedder(client, EmbeddingCache(os.path.join(cache_dir, f"cold{run}.sqlite3")))
+            job, latencies = timed(ingest, data, embed_batch, count_tokens, args)
+            cold_ms += latencies
+            embed_rates.append(job.embedding_rate())
+        job, warm_ms = timed(ingest, data, embed_batch, count_tokens, args, repeats=args.repeats)
+        ingest_peak = peak_mib(ingest, data, make_embedder(client, EmbeddingCache(os.path.join(cache_dir, "peak.sqlite3")))[0], count_tokens, args)
+
+    start = time.perf_counter()
+    docs, matrix, pending = job.snapshot()
+    vectors = VectorIndex(matrix, args.precision, pending)
+    lexical = BM25Index()
+    lexical.add(docs)
+    index_ms = (time.perf_counter() - start) * 1000
+
+    retrieval_ms = [
+        sum(hybrid_search(question, docs, vectors, lexical, embed_query, top_k=args.top_k)["timings"].values())
+        for question in questions
+    ]
+
+    with ThreadPoolExecutor(max_workers=args.concurrency * 3, thread_name_prefix="model") as model_pool, \
+            ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="question") as question_pool:
+        start = time.perf_counter()
+        answers = list(question_pool.map(
+            lambda question: answer_question(client, model_pool, answer_cache, question, docs, vectors, lexical,
+                                             embed_query, args.top_k, not args.no_cascade, args.quality_threshold),
+            questions
+        ))
+        answer_seconds = time.perf_counter() - start
+
+    seconds = lambda latencies: float(np.mean(latencies)) / 1000
+    tiers = [answer["tier"] for answer in answers]
+    report = {
+        "config": vars(args) | {"base_url": base_url},
+        "pdf": {"pages": args.pages, "bytes": len(data), "characters": len(pdf_pages.text), "chunks": len(docs), "tokens": tokens},
+        "stages": {
+            "read_pdf": latency_stats(read_ms) | {
+                "pages_per_s": round(args.pages / seconds(read_ms), 1),
+                "peak_mib": peak_mib(read_pdf, data),
+            },
+            "chunk_text": latency_stats(chunk_ms) | {
+                "chunks_per_s": round(len(docs) / seconds(chunk_ms), 1),
+                "peak_mib": peak_mib(chunk_text, pdf_pages.text, args.chunk_size, args.overlap),
+            },
+            "ingest_cold": latency_stats(cold_ms) | {
+                "chunks_per_s": round(len(docs) / seconds(cold_ms), 1),
+                "tokens_per_s": round(tokens / seconds(cold_ms), 1),
+                "embedded_chunks_per_s": round(float(np.mean(embed_rates)), 1),
+                "peak_mib": ingest_peak,
+            },
+            "ingest_warm": latency_stats(warm_ms) | {"chunks_per_s": round(len(docs) / seconds(warm_ms), 1)},
+            "index_build": {"ms": round(index_ms, 2), "vector_mib": round(vectors.nbytes / 2**20, 2)},
+            "retrieval": latency_stats(retrieval_ms) | {"queries_per_s": round(len(questions) / (sum(retrieval_ms) / 1000), 1)},
+            "answer": {
+                "end_to_end": latency_stats([answer["total_ms"] for answer in answers]),
+                "retrieval": latency_stats([answer["retrieval_ms"] for answer in answers]),
+                "ttft": latency_stats([ttft for answer in answers for ttft in answer["ttft_ms"]]),
+                "questions_per_s": round(len(questions) / answer_seconds, 2),
+                "concurrency": args.concurrency,
+                "final_tier": {tier: tiers.count(tier) for tier in ("gpt35", "gpt4o", "improved")},
+                "model_calls_per_question": round(float(np.mean([answer["calls"] for answer in answers])), 2),
+                "answer_cache_hits": sum(answer["cache_hits"] for answer in answers),
+            },
+        },
+        "peak_rss_mib": peak_rss_mib(),
+    }
+    if server is not None:
+        report["mock_server"] = dict(server.stats)
+        server.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
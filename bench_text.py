@@ -0,0 +1,140 @@
+"""Microbenchmarks of the answer text analyzers over synthetic answers of several lengths.
+
+Usage: python bench_text.py --lengths 50 200 800 3000 --repeat 15 > bench_text.json
+"""
+import argparse
+import json
+import random
+import statistics
+import timeit
+
+from text_analysis import (
+    AnalyzedText, add_keywords, add_topic_keywords, analyze_answer_quality, analyze_question_complexity,
+    analyze_sentiment_and_tone, analyze_text_keywords, classify_topic, improve_math_readability,
+)
+
+QUESTIONS = [
+    "What is the derivative of sin x and why?",
+    "Compare the pros and cons of the two strategies in the document",
+    "Explain the main concept of the lecture in simple terms",
+    "How does the algorithm handle database updates, and which approach is most efficient?",
+    "Summarize the contract obligations and the regulation it refers to",
+]
+
+# Answer-like sentences: structure words, hedges, lexicon terms and LaTeX the analyzers look for
+SENTENCES = [
+    "First, the derivative of $\\sin x$ is $\\cos x$, which follows from the limit definition.",
+    "For instance, the algorithm stores each record in the database and updates the index in place.",
+    "Specifically, the integral $\\int_{0}^{1} x^2 dx$ equals $\\frac{1}{3}$ by the power rule.",
+    "However, this approach may be difficult to apply when the data is noisy.",
+    "Second, the strategy focuses on customer revenue and long-term service quality.",
+    "Therefore, the treatment reduced the main symptom in most patients at the hospital.",
+    "The contract defines the rights and obligations of both parties under the regulation.",
+    "Perhaps the most useful example is the sum $\\sum_{i=1}^{n} i = \\frac{n(n+1)}{2}$.",
+    "Also, understanding the course material builds knowledge that is effective in practice.",
+    "The standard deviation $\\sigma$ and the mean $\\mu$ describe the distribution of $\\theta$.",
+    "I'm not sure the result holds in general, but it is a good and successful approximation.",
+    "Third, the code is organized so that development of the API stays simple and maintainable.",
+    "In summary, the method has an advantage over the alternative, with one problem to watch.",
+    "The value of $\\sqrt{2}$ is irrational, as shown by a short proof by contradiction.",
+]
+
+
+def make_answer(words: int, rng: random.Random) -> str:
+    """Answer of about `words` words built from answer-like sentences and paragraphs"""
+    sentences = []
+    count = 0
+    while count < words:
+        sentence = rng.choice(SENTENCES)
+        sentences.append(sentence)
+        count += len(sentence.split())
+        if rng.random() < 0.2:
+            sentences.append("\n\n")
+    return " ".join(sentences).strip()
+
+
+def add_synthetic_keywords(count: int, rng: random.Random):
+    """Grow every lexicon by count words and two-word phrases that never occur in the corpus"""
+    keywords = [f"kw{i}" if i % 2 else f"kw{i} term{rng.randrange(count)}" for i in range(count)]
+    for lexicon in ("complex", "simple", "specific", "uncertain", "positive", "negative"):
+        add_keywords(lexicon, keywords)
+    add_topic_keywords("Synthetic", keywords)
+
+
+def make_corpus(lengths: list, answers_per_length: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    return {length: [make_answer(length, rng) for _ in range(answers_per_length)] for length in lengths}
+
+
+BENCHMARKS = {
+    "analyze_answer_quality": lambda answer, question: analyze_answer_quality(answer, question),
+    "analyze_question_complexity": lambda answer, question: analyze_question_complexity(answer),
+    "improve_math_readability": lambda answer, question: improve_math_readability(answer),
+    "analyze_text_keywords": lambda answer, question: analyze_text_keywords(answer, top_n=10),
+    "classify_topic": lambda answer, question: classify_topic(answer),
+    "analyze_sentiment_and_tone": lambda answer, question: analyze_sentiment_and_tone(answer),
+    "AnalyzedText": lambda answer, question: AnalyzedText(answer),
+}
+
+
+def analyze_all(answer: str, question: str):
+    """What the app runs per answer: one shared tokenization feeding every analyzer"""
+    text = AnalyzedText(answer)
+    analyze_answer_quality(text, question)
+    analyze_sentiment_and_tone(text)
+    classify_topic(text)
+    analyze_text_keywords(text, top_n=10)
+
+
+BENCHMARKS["all_analyzers"] = analyze_all
+
+
+def bench(fn, cases: list, repeat: int, min_time: float) -> dict:
+    """Per-call microseconds over `repeat` samples, each sized to take at least min_time seconds"""
+    def run():
+        for answer, question in cases:
+            fn(answer, question)
+
+    timer = timeit.Timer(run)  # Garbage collection is disabled while timing
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    per_call_us = sorted(t / number / len(cases) * 1e6 for t in timer.repeat(repeat, number))
+    median = statistics.median(per_call_us)
+    return {
+        "min_us": round(per_call_us[0], 2),
+        "median_us": round(median, 2),
+        "max_us": round(per_call_us[-1], 2),
+        # Relative spread of the samples; compare runs only when this is small
+        "stdev_pct": round(statistics.stdev(per_call_us) / median * 100, 2) if len(per_call_us) > 1 else 0.0,
+        "calls_per_s": round(1e6 / median, 1),
+        "loops": number,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[50, 200, 800, 3000], help="Answer lengths in words")
+    parser.add_argument("--answers", type=int, default=20, help="Answers per length")
+    parser.add_argument("--repeat", type=int, default=15, help="Timing samples per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Seconds per sample")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run only these analyzers")
+    parser.add_argument("--extra-keywords", type=int, default=0, help="Synthetic entries added to every lexicon")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.extra_keywords:
+        add_synthetic_keywords(args.extra_keywords, random.Random(args.seed))
+    corpus = make_corpus(args.lengths, args.answers, args.seed)
+    report = {"config": vars(args), "results": {}}
+    for name in args.only or BENCHMARKS:
+        report["results"][name] = {}
+        for length, answers in corpus.items():
+            cases = [(answer, QUESTIONS[i % len(QUESTIONS)]) for i, answer in enumerate(answers)]
+            stats = bench(BENCHMARKS[name], cases, args.repeat, args.min_time)
+            report["results"][name][str(length)] = {"chars": sum(map(len, answers)) // len(answers)} | stats
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
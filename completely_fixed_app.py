@@ -1,11 +1,15 @@
 import streamlit as st
 import openai
-import requests
 import json
 import time
 from typing import Optional
 import os
 
+from embeddings import backoff_delay
+from gpt_oss import GPT_OSS_BASE_URL, build_messages, get_gpt_oss_client
+from health import OPEN, endpoint_key, get_circuit_breaker, get_health_prober
+from llm_clients import get_http_session, get_openai_client
+
 # Page settings
 st.set_page_config(
     page_title="AI PDF Assistant",
@@ -36,74 +40,30 @@ api_keys = load_api_keys()
 # OpenAI client settings
 if 'OPENAI_API_KEY' in api_keys:
     openai.api_key = api_keys['OPENAI_API_KEY']
-    client = openai.OpenAI(api_key=api_keys['OPENAI_API_KEY'])
+    client = get_openai_client(api_keys['OPENAI_API_KEY'])
 else:
     client = None
 
+# GPT-OSS server health: probed in the background; the client's calls go through the endpoint's circuit breaker
+GPT_OSS_URL = endpoint_key(GPT_OSS_BASE_URL)
+gpt_oss_breaker = get_circuit_breaker(GPT_OSS_URL)
+gpt_oss_prober = get_health_prober(f"{GPT_OSS_URL}/health", gpt_oss_breaker, get_http_session("gpt-oss"))
+gpt_oss_client = get_gpt_oss_client()
+
 # Check GPT-OSS server status
 def check_gpt_oss_server():
-    """Checks GPT-OSS server status."""
-    try:
-        response = requests.get("http://localhost:8000/health", timeout=5)
-        return response.status_code == 200
-    except:
-        return True  # For remote app: always return True
+    """Checks GPT-OSS server status (cached result of the background health check)."""
+    # Unknown until the first probe completes; the breaker still guards calls
+    return gpt_oss_prober.healthy is not False
 
-# GPT-OSS API call (using Harmony Format)
+# GPT-OSS API call
 def call_gpt_oss_api(user_question: str, context: str = "", model_name: str = "gpt-oss-20b") -> str:
-    """Calls GPT-OSS API (using Harmony Format)."""
+    """Calls the local GPT-OSS server (reasoning level set by GPT_OSS_REASONING)."""
     try:
-        # Check API key
-        if not client:
-            return "OpenAI API key is not configured."
-        
-        # Generate prompt matching Harmony Format
-        if context:
-            system_prompt = f"Context: {context}\n\nReasoning: medium"
-            user_prompt = user_question
-        else:
-            system_prompt = "Reasoning: medium"
-            user_prompt = user_question
-        
-        # OpenAI API call (GPT-OSS uses harmony format)
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",  # Should actually use gpt-oss-20b, but here for testing
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            max_tokens=2000,
-            temperature=0.7
-        )
-        
-        # Extract actual AI response
-        ai_response = response.choices[0].message.content.strip()
-        
-        # Format in GPT-OSS Harmony Format style
-        formatted_response = f"""**GPT-OSS Answer (Free Local)**
-
-**Question:** {user_question}
-
-**Context-based Expert Analysis:**
-
-1. **Key Content Summary:** {ai_response}
+        answer = gpt_oss_client.chat(build_messages(user_question, context), model_name, max_tokens=2000, temperature=0.7)
+        return f"""**GPT-OSS Answer (Free Local)**
 
-2. **In-depth Analysis:**
-   ○ Key Points: {ai_response[:100]}...
-   ○ Relevance Analysis: Connection between question and answer analysis complete
-   ○ Additional Considerations: Analysis from a scalable perspective
-
-3. **Practical Recommendations:**
-   • Immediately applicable insights: {ai_response[:150]}...
-   • Future development: Continuous learning and application
-   • Additional research: In-depth study of related fields recommended
-
----
-GPT-OSS model advanced AI analysis: This answer was generated utilizing the advanced natural language processing and analysis capabilities of the GPT-OSS open-source model. It deeply understands the meaning of the context and provides comprehensive and practical answers to the question.
-
-High-performance GPT-OSS model running directly on Streamlit Cloud."""
-        
-        return formatted_response
+{answer.strip()}"""
             
     except Exception as e:
         return f"API call error: {str(e)}"
@@ -112,21 +72,24 @@ High-performance GPT-OSS model running directly on Streamlit Cloud."""
 def safe_gpt_oss_call(user_question: str, context: str = "", max_retries: int = 3) -> str:
     """Safe GPT-OSS API call (with retry logic)."""
     for attempt in range(max_retries):
+        # Fail fast while the server is known to be down
+        if gpt_oss_breaker.state == OPEN:
+            return f"GPT-OSS server is unavailable (circuit {gpt_oss_breaker.state}). Please check server status."
         try:
             response = call_gpt_oss_api(user_question, context)
             
-            # Check if response is valid
+            # Check if response is valid (transport and HTTP errors already reached the breaker inside the client)
             if response and len(response.strip()) > 20 and "error" not in response and "failed" not in response:
                 return response
             else:
                 st.warning(f"Attempt {attempt + 1}: Response is not valid. Retrying...")
                 if attempt < max_retries - 1:
-                    time.sleep(3)
+                    time.sleep(backoff_delay(attempt, base=0.25, cap=1.0))
                     
         except Exception as e:
             st.error(f"Attempt {attempt + 1} failed: {e}")
             if attempt < max_retries - 1:
-                time.sleep(5)
+                time.sleep(backoff_delay(attempt, base=0.25, cap=1.0))
     
     return "Unable to get model response. Please check server status."
 
@@ -166,6 +129,8 @@ def main():
         # Check server status
         if check_gpt_oss_server():
             st.success("✅ GPT-OSS server is running")
+            if gpt_oss_prober.latency_ms is not None:
+                st.caption(f"Health check {gpt_oss_prober.latency_ms:.0f} ms · {gpt_oss_prober.age():.0f}s ago · circuit {gpt_oss_breaker.state}")
         else:
             st.error("❌ GPT-OSS server is not running")
             st.info("💡 Solution:")
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+import numpy as np
+
+# Local token counting (optional)
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# OpenAI /v1/embeddings request limits
+MAX_REQUEST_ITEMS = 2048
+MAX_REQUEST_TOKENS = 300_000
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".embedding_cache.sqlite3"),
+)
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH = 500
+
+
+def text_hash(text: str) -> str:
+    """Cache key for a chunk of text"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def make_token_counter(model: str = "text-embedding-3-small"):
+    """Token counting function for model (estimated when tiktoken is unavailable)"""
+    if TIKTOKEN_AVAILABLE:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode_ordinary(text))
+    # ~4 characters per token in English; stay on the safe side of the limit
+    return lambda text: len(text) // 3 + 1
+
+
+def pack_batches(texts, count_tokens, max_tokens: int = MAX_REQUEST_TOKENS, max_items: int = MAX_REQUEST_ITEMS):
+    """Group a stream of texts into as few in-order batches as fit the token and item budgets"""
+    batch = []
+    batch_tokens = 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_items):
+            yield batch
+            batch = []
+            batch_tokens = 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def retry_after_seconds(error):
+    """Server-requested wait from a failed API call's Retry-After headers, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: float = None, base: float = 1.0, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter, never shorter than Retry-After"""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    return max(delay, retry_after) if retry_after is not None else delay
+
+
+class EmbeddingCache:
+    """Persistent (model, sha1(text)) -> embedding cache stored in SQLite"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " text_hash TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " PRIMARY KEY (model, text_hash))"
+            )
+
+    def get_many(self, model: str, texts: list) -> list:
+        """Cached float32 vectors for texts (None where missing)"""
+        hashes = [text_hash(text) for text in texts]
+        found = {}
+        with self._lock:
+            for i in range(0, len(hashes), _LOOKUP_BATCH):
+                part = hashes[i:i + _LOOKUP_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(part))})",
+                    [model, *part],
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        vectors = [found.get(key) for key in hashes]
+        hit_count = sum(vector is not None for vector in vectors)
+        self.hits += hit_count
+        self.misses += len(vectors) - hit_count
+        return vectors
+
+    def put_many(self, model: str, texts: list, vectors: list):
+        """Store vectors (all-zero placeholders are never cached)"""
+        rows = [
+            (model, text_hash(text), np.asarray(vector, dtype=np.float32).tobytes())
+            for text, vector in zip(texts, vectors)
+            if vector is not None and np.any(vector)
+        ]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+
+    def get_or_fetch(self, model: str, texts: list, fetch) -> list:
+        """Vectors for texts, calling fetch(missing_texts) only for cache misses"""
+        vectors = self.get_many(model, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            fetched = fetch(missing_texts)
+            self.put_many(model, missing_texts, fetched)
+            for i, vector in zip(missing, fetched):
+                vectors[i] = vector
+        return vectors
+
+
+def build_embedding_matrix(embs: list) -> np.ndarray:
+    """Stack embeddings into a contiguous L2-normalized float32 matrix"""
+    matrix = np.ascontiguousarray(np.vstack(embs), dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0  # Keep failed (all-zero) rows at score 0
+    matrix /= norms
+    return matrix
+
+
+def embed_concurrently(batches, embed_batch, max_in_flight: int = 4):
+    """Yield (batch, result) in input order while keeping up to max_in_flight requests running"""
+    max_in_flight = max(1, max_in_flight)
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="embed") as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append((batch, pool.submit(embed_batch, batch)))
+            if len(pending) >= max_in_flight:
+                done_batch, future = pending.popleft()
+                yield done_batch, future.result()
+        while pending:
+            done_batch, future = pending.popleft()
+            yield done_batch, future.result()
@@ -0,0 +1,102 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from health import endpoint_key, get_circuit_breaker, get_health_prober
+from llm_clients import get_openai_client
+
+# Local OpenAI-compatible server, e.g. `vllm serve gpt-oss-20b --host 0.0.0.0 --port 8000`
+GPT_OSS_BASE_URL = os.getenv("GPT_OSS_BASE_URL", "http://localhost:8000/v1")
+GPT_OSS_API_KEY = os.getenv("GPT_OSS_API_KEY", "EMPTY")  # Only checked if the server was started with --api-key
+GPT_OSS_REASONING = os.getenv("GPT_OSS_REASONING", "medium")
+GPT_OSS_MAX_IN_FLIGHT = int(os.getenv("GPT_OSS_MAX_IN_FLIGHT", "8"))  # Concurrent requests per batch
+REASONING_LEVELS = ("low", "medium", "high")
+
+
+def build_messages(question: str, context: str = "", system: str = None) -> list:
+    """Chat messages for a question with optional context"""
+    messages = []
+    if system or context:
+        parts = [part for part in (system, f"Context: {context}" if context else None) if part]
+        messages.append({"role": "system", "content": "\n\n".join(parts)})
+    messages.append({"role": "user", "content": question})
+    return messages
+
+
+class GptOssClient:
+    """Chat client for a gpt-oss model behind an OpenAI-compatible server"""
+
+    def __init__(self, base_url: str = GPT_OSS_BASE_URL, api_key: str = GPT_OSS_API_KEY,
+                 reasoning: str = GPT_OSS_REASONING, breaker=None, max_in_flight: int = GPT_OSS_MAX_IN_FLIGHT):
+        if reasoning not in REASONING_LEVELS:
+            raise ValueError(f"reasoning must be one of {REASONING_LEVELS}, got {reasoning!r}")
+        self.base_url = base_url
+        self.reasoning = reasoning
+        self.breaker = breaker
+        self.max_in_flight = max_in_flight
+        self.prober = None
+        # Pooled keep-alive connections; no SDK retries, the breaker decides when to try again
+        self._client = get_openai_client(api_key, base_url, max_retries=0)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _create(self, messages: list, model: str, stream: bool, **options):
+        extra_body = {"reasoning_effort": self.reasoning, **options.pop("extra_body", {})}
+        return self._client.chat.completions.create(
+            model=model, messages=messages, stream=stream, extra_body=extra_body, **options
+        )
+
+    def _guarded(self, fn, *args, **kwargs):
+        return self.breaker.call(fn, *args, **kwargs) if self.breaker is not None else fn(*args, **kwargs)
+
+    def chat(self, messages: list, model: str = "gpt-oss-20b", max_tokens: int = 1000,
+             temperature: float = 0.7, **options) -> str:
+        """Final answer text (the reasoning channel is not included)"""
+        response = self._guarded(self._create, messages, model, False,
+                                 max_tokens=max_tokens, temperature=temperature, **options)
+        return response.choices[0].message.content or ""
+
+    def stream(self, messages: list, model: str = "gpt-oss-20b", max_tokens: int = 1000,
+               temperature: float = 0.7, **options):
+        """Yield answer text deltas as the server produces them"""
+        chunks = self._guarded(self._create, messages, model, True,
+                               max_tokens=max_tokens, temperature=temperature, **options)
+        try:
+            for chunk in chunks:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception:
+            if self.breaker is not None:
+                self.breaker.record_failure()
+            raise
+
+    def chat_many(self, conversations: list, model: str = "gpt-oss-20b", **options) -> list:
+        """Answers for several conversations, in order
+
+        Requests go out together (up to max_in_flight) so the server's continuous
+        batching can run them as one batch instead of one after another.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="gpt-oss")
+        return list(self._executor.map(lambda messages: self.chat(messages, model, **options), conversations))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_gpt_oss_client(base_url: str = GPT_OSS_BASE_URL, reasoning: str = GPT_OSS_REASONING) -> GptOssClient:
+    """Shared client per (endpoint, reasoning level), guarded by the endpoint's circuit breaker
+
+    The endpoint's background health prober is started too, so a dead server opens
+    the breaker before any request has to time out against it.
+    """
+    key = (base_url, reasoning)
+    with _clients_lock:
+        if key not in _clients:
+            breaker = get_circuit_breaker(base_url)
+            client = GptOssClient(base_url, reasoning=reasoning, breaker=breaker)
+            client.prober = get_health_prober(f"{endpoint_key(base_url)}/health", breaker)
+            _clients[key] = client
+        return _clients[key]
@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+
+import requests
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# Health check and breaker settings
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "5"))  # Seconds between probes
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))  # Consecutive failures that open it
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))  # Seconds open before a trial call
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker for one endpoint"""
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._state = CLOSED
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Whether a call may go out now (half-open lets a single trial through)"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._state = CLOSED
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._current_state() == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open()
+
+    def trip(self):
+        """Open immediately (e.g. the health check failed)"""
+        with self._lock:
+            self._open()
+
+    def probe_succeeded(self):
+        """Endpoint answered its health check: let the next call through as a trial"""
+        with self._lock:
+            if self._current_state() == OPEN:
+                self._state = HALF_OPEN
+                self._trial_in_flight = False
+
+    def _open(self):
+        self._state = OPEN
+        self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn through the breaker, raising CircuitOpenError while open"""
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit {self.state})")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+class HealthProber:
+    """Polls a health URL on a background thread and caches the result"""
+
+    def __init__(self, url: str, breaker: CircuitBreaker = None, session: requests.Session = None,
+                 interval: float = HEALTH_PROBE_INTERVAL, timeout: float = HEALTH_PROBE_TIMEOUT):
+        self.url = url
+        self.breaker = breaker
+        self.interval = interval
+        self.timeout = timeout
+        self.healthy = None  # None until the first probe completes
+        self.latency_ms = None
+        self.error = None
+        self.checked_at = None
+        self._session = session or requests.Session()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "HealthProber":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def probe(self) -> bool:
+        start = time.perf_counter()
+        try:
+            response = self._session.get(self.url, timeout=self.timeout)
+            healthy = response.status_code == 200
+            error = None if healthy else f"HTTP {response.status_code}"
+        except requests.RequestException as e:
+            healthy = False
+            error = str(e)
+        self.latency_ms = (time.perf_counter() - start) * 1000
+        self.healthy, self.error, self.checked_at = healthy, error, time.monotonic()
+        if self.breaker is not None:
+            if healthy:
+                self.breaker.probe_succeeded()
+            else:
+                self.breaker.trip()
+        return healthy
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.probe()
+            self._stop.wait(self.interval)
+
+    def age(self):
+        """Seconds since the last completed probe (None before the first)"""
+        return None if self.checked_at is None else time.monotonic() - self.checked_at
+
+
+# One breaker and prober per endpoint for the whole process (they outlive Streamlit reruns)
+_breakers = {}
+_probers = {}
+_lock = threading.Lock()
+
+
+def endpoint_key(url: str) -> str:
+    """Server root of an endpoint URL, so ".../v1" and the bare host share one breaker"""
+    return url.rstrip("/").removesuffix("/v1")
+
+
+def get_circuit_breaker(url: str) -> CircuitBreaker:
+    """Shared breaker for the server behind url"""
+    name = endpoint_key(url)
+    with _lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def get_health_prober(url: str, breaker: CircuitBreaker = None, session: requests.Session = None) -> HealthProber:
+    """Started background prober for url"""
+    with _lock:
+        if url not in _probers:
+            _probers[url] = HealthProber(url, breaker, session).start()
+        return _probers[url]
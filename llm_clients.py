@@ -0,0 +1,113 @@
+import hashlib
+import os
+import threading
+
+import requests
+from openai import OpenAI
+from requests.adapters import HTTPAdapter
+
+# Explicit connection pool limits (httpx ships with the openai/anthropic SDKs)
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+# Anthropic SDK (optional)
+try:
+    import anthropic
+    ANTHROPIC_AVAILABLE = True
+except ImportError:
+    ANTHROPIC_AVAILABLE = False
+
+# Google Generative AI SDK (optional)
+try:
+    import google.generativeai as genai
+    GENAI_AVAILABLE = True
+except ImportError:
+    GENAI_AVAILABLE = False
+
+# Pool and timeout settings
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))  # Keep-alive connections per provider
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))  # Seconds per request
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))  # Per host, for requests sessions
+HTTP_TIMEOUT = (LLM_CONNECT_TIMEOUT, LLM_TIMEOUT)  # (connect, read) for requests calls
+
+# One client per (provider, key, endpoint) for the whole process; Streamlit reruns
+# re-execute the app script but not imported modules, so these survive reruns and sessions
+_clients = {}
+_lock = threading.Lock()
+
+
+def _client_key(provider: str, api_key: str, *extra) -> tuple:
+    """Registry key (API keys are stored hashed)"""
+    key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+    return (provider, key_hash, *extra)
+
+
+def _get_or_create(key: tuple, factory):
+    with _lock:
+        if key not in _clients:
+            _clients[key] = factory()
+        return _clients[key]
+
+
+def _pooled_http_client():
+    """httpx client with keep-alive pool limits and timeouts (None without httpx)"""
+    if not HTTPX_AVAILABLE:
+        return None
+    return httpx.Client(
+        limits=httpx.Limits(max_connections=LLM_POOL_SIZE, max_keepalive_connections=LLM_POOL_SIZE),
+        timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+    )
+
+
+def get_openai_client(api_key: str, base_url: str = None, max_retries: int = LLM_MAX_RETRIES) -> OpenAI:
+    """Shared OpenAI (or OpenAI-compatible server) client"""
+    def create():
+        options = {"api_key": api_key, "max_retries": max_retries, "timeout": LLM_TIMEOUT}
+        if base_url:
+            options["base_url"] = base_url
+        http_client = _pooled_http_client()
+        if http_client is not None:
+            options["http_client"] = http_client
+        return OpenAI(**options)
+    return _get_or_create(_client_key("openai", api_key, base_url, max_retries), create)
+
+
+def get_anthropic_client(api_key: str):
+    """Shared Anthropic client (None if the SDK or key is missing)"""
+    if not ANTHROPIC_AVAILABLE or not api_key:
+        return None
+
+    def create():
+        options = {"api_key": api_key, "max_retries": LLM_MAX_RETRIES, "timeout": LLM_TIMEOUT}
+        http_client = _pooled_http_client()
+        if http_client is not None:
+            options["http_client"] = http_client
+        return anthropic.Anthropic(**options)
+    return _get_or_create(_client_key("anthropic", api_key), create)
+
+
+def get_gemini_model(api_key: str, model_name: str = "gemini-pro"):
+    """Shared Gemini model handle (None if the SDK or key is missing)"""
+    if not GENAI_AVAILABLE or not api_key:
+        return None
+
+    def create():
+        genai.configure(api_key=api_key)
+        return genai.GenerativeModel(model_name)
+    return _get_or_create(_client_key("gemini", api_key, model_name), create)
+
+
+def get_http_session(name: str = "default") -> requests.Session:
+    """Shared requests session with a keep-alive pool (pass timeout=HTTP_TIMEOUT per call)"""
+    def create():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    return _get_or_create(("http", name), create)
@@ -0,0 +1,309 @@
+"""Deterministic OpenAI-compatible stand-in server (chat completions, streaming, embeddings).
+
+Usage: python mock_llm_server.py --port 8000 --ttft-ms 400 --token-ms 25 --error-429 0.02
+
+Point the apps at it with OPENAI_BASE_URL / GPT_OSS_BASE_URL=http://localhost:8000/v1.
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+_WORD_RE = re.compile(r"\w+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+# Prompt scaffolding lines that should not be echoed into answers
+_SCAFFOLD_RE = re.compile(r"^(question|answer|reference information|context|previous conversation|pdf content|please (answer|improve))\b", re.IGNORECASE)
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+
+class MockConfig:
+    """Latency, error-injection and output settings of the mock server"""
+
+    def __init__(self, seed: int = 0, latency_dist: str = "lognormal", latency_spread: float = 0.3,
+                 ttft_ms: float = 400.0, token_ms: float = 25.0, embed_ms: float = 80.0, embed_item_ms: float = 0.5,
+                 error_429: float = 0.0, error_500: float = 0.0, error_timeout: float = 0.0,
+                 timeout_seconds: float = 120.0, retry_after: float = 1.0, answer_words: int = 120,
+                 embedding_dim: int = 1536):
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_dist must be one of {LATENCY_DISTRIBUTIONS}")
+        self.seed = seed
+        self.latency_dist = latency_dist
+        self.latency_spread = latency_spread  # Relative half-width (uniform) or sigma (lognormal)
+        self.ttft_ms = ttft_ms                # Median time to first token
+        self.token_ms = token_ms              # Median gap between streamed tokens
+        self.embed_ms = embed_ms              # Median embeddings request overhead
+        self.embed_item_ms = embed_item_ms    # Added per input text
+        self.error_429 = error_429            # Fraction of requests answered 429 (with Retry-After)
+        self.error_500 = error_500
+        self.error_timeout = error_timeout    # Fraction of requests that hang for timeout_seconds
+        self.timeout_seconds = timeout_seconds
+        self.retry_after = retry_after
+        self.answer_words = answer_words
+        self.embedding_dim = embedding_dim
+
+
+def _seed_for(*parts) -> int:
+    return int.from_bytes(hashlib.sha256("\x1f".join(map(str, parts)).encode("utf-8")).digest()[:8], "big")
+
+
+def deterministic_embedding(text: str, dim: int = 1536) -> np.ndarray:
+    """Unit vector from signed feature hashing of words and word pairs (similar texts score high)"""
+    vector = np.zeros(dim, dtype=np.float32)
+    words = _WORD_RE.findall(text.lower())
+    for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        h = _seed_for(feature)
+        vector[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+    if not vector.any():
+        vector = np.random.default_rng(_seed_for(text)).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def deterministic_answer(messages: list, model: str, max_words: int) -> str:
+    """Answer text built from the prompt's own sentences (same prompt, same answer)"""
+    prompt = "\n".join(str(message.get("content") or "") for message in messages)
+    rng = random.Random(_seed_for(model, prompt))
+    sentences = [s.strip() for s in _SENTENCE_RE.split(prompt) if len(s.split()) >= 4 and not _SCAFFOLD_RE.match(s.strip())]
+    last = str(messages[-1].get("content") or "").strip() if messages else ""
+    match = re.search(r"Question:\s*(.+)", last)
+    question = match.group(1).strip() if match else (last.splitlines() or ["the question"])[-1]
+    parts = [f"Based on the provided information, here is a specific answer to: {question}"]
+    while sentences and sum(len(p.split()) for p in parts) < max_words:
+        parts.append(sentences.pop(rng.randrange(len(sentences))))
+    parts.append("For example, the key points above can be applied directly in practice.")
+    return " ".join(" ".join(parts).split()[:max_words])
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: MockConfig):
+        super().__init__(address, MockHandler)
+        self.config = config
+        self.stats = {"chat": 0, "stream": 0, "embeddings": 0, "429": 0, "500": 0, "timeout": 0}
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+
+    def sample_ms(self, median: float) -> float:
+        """One draw from the configured latency distribution"""
+        config = self.config
+        with self._lock:
+            if config.latency_dist == "uniform":
+                return max(0.0, self._rng.uniform(median * (1 - config.latency_spread), median * (1 + config.latency_spread)))
+            if config.latency_dist == "lognormal":
+                return median * math.exp(self._rng.gauss(0.0, config.latency_spread))
+            return median
+
+    def draw_error(self):
+        """Injected failure for this request ("429", "500", "timeout") or None"""
+        config = self.config
+        with self._lock:
+            roll = self._rng.random()
+        for kind, rate in (("429", config.error_429), ("500", config.error_500), ("timeout", config.error_timeout)):
+            if roll < rate:
+                self.count(kind)
+                return kind
+            roll -= rate
+        return None
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, chunked streaming
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str, error_type: str, headers: dict = None):
+        self._send_json(status, {"error": {"message": message, "type": error_type, "code": status}}, headers)
+
+    def _inject_error(self) -> bool:
+        """Serve an injected failure; True if the request was consumed"""
+        server = self.server
+        kind = server.draw_error()
+        if kind == "429":
+            retry_after = server.config.retry_after
+            self._send_error(429, "Rate limit reached (injected)", "rate_limit_exceeded",
+                             {"Retry-After": f"{retry_after:g}", "retry-after-ms": str(int(retry_after * 1000))})
+        elif kind == "500":
+            self._send_error(500, "Internal server error (injected)", "server_error")
+        elif kind == "timeout":
+            time.sleep(server.config.timeout_seconds)
+            self.close_connection = True
+        return kind is not None
+
+    def do_GET(self):
+        if self.path in ("/health", "/v1/health"):
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [
+                {"id": model, "object": "model", "owned_by": "mock"}
+                for model in ("gpt-oss-20b", "gpt-oss-120b", "gpt-3.5-turbo", "gpt-4o-mini", "gpt-4o", "text-embedding-3-small")
+            ]})
+        elif self.path == "/stats":
+            self._send_json(200, dict(self.server.stats))
+        else:
+            self._send_error(404, f"Unknown path {self.path}", "not_found")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_error(400, "Invalid JSON body", "invalid_request_error")
+            return
+        if self.path == "/v1/chat/completions":
+            self._chat_completions(request)
+        elif self.path == "/v1/embeddings":
+            self._embeddings(request)
+        else:
+            self._send_error(404, f"Unknown path {self.path}", "not_found")
+
+    def _chat_completions(self, request: dict):
+        server, config = self.server, self.server.config
+        if self._inject_error():
+            return
+        model = request.get("model", "mock")
+        if request.get("reasoning_effort"):
+            server.count(f"reasoning_{request['reasoning_effort']}")  # gpt-oss reasoning level, as sent by GptOssClient
+        max_words = min(config.answer_words, int(request.get("max_tokens") or config.answer_words))
+        words = deterministic_answer(request.get("messages") or [], model, max_words).split()
+        completion_id = f"chatcmpl-{_seed_for(time.time_ns()) % 10**12}"
+        created = int(time.time())
+        prompt_tokens = sum(len(str(m.get("content") or "").split()) for m in request.get("messages") or [])
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words), "total_tokens": prompt_tokens + len(words)}
+
+        time.sleep(server.sample_ms(config.ttft_ms) / 1000)
+        if not request.get("stream"):
+            server.count("chat")
+            time.sleep(sum(server.sample_ms(config.token_ms) for _ in words[1:]) / 1000)
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        server.count("stream")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def event(delta: dict, finish_reason=None, **extra):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+
+        try:
+            event({"role": "assistant", "content": ""})
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(server.sample_ms(config.token_ms) / 1000)
+                event({"content": word if i == 0 else " " + word})
+            event({}, "stop")
+            if (request.get("stream_options") or {}).get("include_usage"):
+                self._write_chunk(f"data: {json.dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model, 'choices': [], 'usage': usage})}\n\n")
+            self._write_chunk("data: [DONE]\n\n")
+            self._write_chunk("")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _write_chunk(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _embeddings(self, request: dict):
+        server, config = self.server, self.server.config
+        if self._inject_error():
+            return
+        inputs = request.get("input")
+        inputs = [inputs] if isinstance(inputs, str) else list(inputs or [])
+        dim = int(request.get("dimensions") or config.embedding_dim)
+        time.sleep((server.sample_ms(config.embed_ms) + config.embed_item_ms * len(inputs)) / 1000)
+        server.count("embeddings")
+        tokens = sum(len(str(text).split()) for text in inputs)
+        self._send_json(200, {
+            "object": "list",
+            "data": [
+                {"object": "embedding", "index": i, "embedding": deterministic_embedding(str(text), dim).tolist()}
+                for i, text in enumerate(inputs)
+            ],
+            "model": request.get("model", "text-embedding-3-small"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, config: MockConfig = None) -> MockLLMServer:
+    """Serve on a background thread (port 0 picks a free port; see .base_url)"""
+    server = MockLLMServer((host, port), config or MockConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency-spread", type=float, default=0.3, help="Uniform half-width or lognormal sigma")
+    parser.add_argument("--ttft-ms", type=float, default=400.0, help="Median time to first token")
+    parser.add_argument("--token-ms", type=float, default=25.0, help="Median gap between tokens")
+    parser.add_argument("--embed-ms", type=float, default=80.0, help="Median embeddings request latency")
+    parser.add_argument("--embed-item-ms", type=float, default=0.5, help="Extra latency per embedded text")
+    parser.add_argument("--error-429", type=float, default=0.0, help="Fraction of requests rate limited")
+    parser.add_argument("--error-500", type=float, default=0.0, help="Fraction of requests failing with 500")
+    parser.add_argument("--error-timeout", type=float, default=0.0, help="Fraction of requests that hang")
+    parser.add_argument("--timeout-seconds", type=float, default=120.0)
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--answer-words", type=int, default=120)
+    parser.add_argument("--embedding-dim", type=int, default=1536)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        seed=args.seed, latency_dist=args.latency_dist, latency_spread=args.latency_spread,
+        ttft_ms=args.ttft_ms, token_ms=args.token_ms, embed_ms=args.embed_ms, embed_item_ms=args.embed_item_ms,
+        error_429=args.error_429, error_500=args.error_500, error_timeout=args.error_timeout,
+        timeout_seconds=args.timeout_seconds, retry_after=args.retry_after, answer_words=args.answer_words,
+        embedding_dim=args.embedding_dim,
+    )
+    server = MockLLMServer((args.host, args.port), config)
+    print(f"Mock LLM server on http://{args.host}:{args.port}/v1 (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,27 @@
 import os
 import streamlit as st
-from openai import OpenAI
-from PyPDF2 import PdfReader
 import numpy as np
 import time
-import re
+import hashlib
+import functools
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from answer_cache import SemanticAnswerCache
+from answer_pipeline import (
+    ANSWER_OPTIONS, IMPROVEMENT_OPTIONS, AnswerStream, answer_fingerprint, build_answer_prompt, build_improvement_prompt,
+    cached_answer_stream, first_steps, improvement_base, next_steps, stream_chat,
+)
+from embeddings import EmbeddingCache, build_embedding_matrix, make_token_counter
+from gpt_oss import get_gpt_oss_client
+from health import OPEN
+from llm_clients import get_anthropic_client, get_gemini_model, get_openai_client
+from pdf_ingest import IngestJob
+from retrieval import BM25Index, VectorIndex, hybrid_search
+from text_analysis import (
+    AnalyzedText, analyze_answer_quality, analyze_question_complexity, analyze_sentiment_and_tone,
+    analyze_text_keywords, classify_topic, improve_math_readability,
+)
+from tracing import PROCESS_TRACER, Tracer
 
 # OpenAI API key configuration (moved to top)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -26,26 +43,18 @@ if not OPENAI_API_KEY:
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
+# Provider clients come from a process-wide registry, so their connection pools survive reruns
 # OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+client = get_openai_client(OPENAI_API_KEY)
 
 # Anthropic client (Claude)
-try:
-    import anthropic
-    claude_client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY) if ANTHROPIC_API_KEY else None
-except ImportError:
-    claude_client = None
+claude_client = get_anthropic_client(ANTHROPIC_API_KEY)
 
 # Google client (Gemini)
-try:
-    import google.generativeai as genai
-    if GOOGLE_API_KEY:
-        genai.configure(api_key=GOOGLE_API_KEY)
-        gemini_model = genai.GenerativeModel('gemini-pro')
-    else:
-        gemini_model = None
-except ImportError:
-    gemini_model = None
+gemini_model = get_gemini_model(GOOGLE_API_KEY, 'gemini-pro')
+
+# GPT-OSS local server (OpenAI-compatible, e.g. vLLM); a dead server fails fast through its breaker
+gpt_oss_client = get_gpt_oss_client()
 
 # Model information
 MODELS = {
@@ -107,8 +116,6 @@ try:
 except ImportError:
     PLOTLY_AVAILABLE = False
 
-from collections import Counter
-
 try:
     import matplotlib.pyplot as plt
     import seaborn as sns
@@ -947,7 +954,7 @@ with st.sidebar:
     quality_threshold = st.slider("Quality Threshold", 1, 10, 7, key="quality_threshold_slider")
     
     st.markdown("#### ⚡ Performance Settings")
-    use_caching = st.checkbox("Enable Caching", value=True, key="caching_checkbox")
+    use_caching = st.checkbox("Enable Caching", value=True, key="caching_checkbox", help="Reuse answers to similar questions on the same retrieved chunks; answers are generated without conversation history while this is on")
     max_search_results = st.slider("Max Search Results", 1, 10, 5, key="max_search_slider")
 
 # Model configuration
@@ -969,55 +976,27 @@ MODELS = {
         "description": "Highest quality premium model",
         "best_for": ["Complex analysis", "Strategy", "Creative tasks"],
         "color": "model-gpt4o"
+    },
+    "gpt-oss-20b": {
+        "name": "GPT-OSS-20B (Local)",
+        "description": "o3-mini level performance, free local execution",
+        "best_for": ["General analysis", "Edge devices", "Fast iteration"],
+        "color": "model-gptoss"
+    },
+    "gpt-oss-120b": {
+        "name": "GPT-OSS-120B (Local)",
+        "description": "o4-mini level performance, free local execution",
+        "best_for": ["Complex reasoning", "Tool use", "High-quality analysis"],
+        "color": "model-gptoss"
     }
 }
 
-def analyze_question_complexity(question: str) -> dict:
-    """Analyze question complexity"""
-    complexity_score = 0
-    question_lower = question.lower()
-    
-    # Complex keywords
-    complex_keywords = [
-        "analyze", "compare", "evaluate", "strategy", "approach", "solution", "alternative", "pros and cons",
-        "why", "how", "which", "most", "optimal", "efficient", "effective", "impact",
-        "relationship", "correlation", "difference", "similar", "characteristic", "advantage", "disadvantage"
-    ]
-    
-    # Simple keywords
-    simple_keywords = [
-        "definition", "explain", "what", "where", "when", "who", "concept",
-        "meaning", "term", "basic", "simple", "summary", "overview"
-    ]
-    
-    # Complexity calculation
-    for word in complex_keywords:
-        if word in question_lower:
-            complexity_score += 2
-    
-    for word in simple_keywords:
-        if word in question_lower:
-            complexity_score -= 1
-    
-    # Consider question length
-    if len(question) > 50:
-        complexity_score += 1
-    if len(question) > 100:
-        complexity_score += 2
-    
-    # Determine question type
-    question_type = "basic"
-    if complexity_score >= 4:
-        question_type = "complex"
-    elif complexity_score >= 2:
-        question_type = "medium"
-    
-    return {
-        "score": complexity_score,
-        "type": question_type,
-        "complex_keywords": [w for w in complex_keywords if w in question_lower],
-        "simple_keywords": [w for w in simple_keywords if w in question_lower]
-    }
+def is_gpt_oss_available() -> bool:
+    """Whether the local GPT-OSS server passed its last health check and its circuit is not open"""
+    prober = gpt_oss_client.prober
+    if prober.healthy is None:
+        prober.probe()  # Background prober has not finished its first check yet
+    return bool(prober.healthy) and gpt_oss_client.breaker.state != OPEN
 
 def select_model_automatically(question: str, context_length: int = 0) -> dict:
     """Automatic model selection"""
@@ -1029,8 +1008,8 @@ def select_model_automatically(question: str, context_length: int = 0) -> dict:
     elif context_length > 2000:
         complexity["score"] += 1
     
-    # GPT-OSS models available (runs directly on Streamlit Cloud)
-    gpt_oss_available = True
+    # Free local GPT-OSS models when their server is up, otherwise the OpenAI tiers
+    gpt_oss_available = is_gpt_oss_available()
     
     # Model selection logic
     if complexity["score"] >= 5:
@@ -1138,6 +1117,7 @@ with st.sidebar:
     rag_enabled = st.toggle("🔍 Enable RAG", value=True)
     use_hierarchical = st.checkbox("Hierarchical Answer Improvement", value=True)
     auto_improve = st.checkbox("Auto Quality Improvement", value=True)
+    use_cascade = st.checkbox("Quality-gated Cascade", value=True, help="Ask GPT-4o (and then improve) only when the previous answer scores below the quality threshold")
     
     st.markdown("---")
     
@@ -1149,11 +1129,29 @@ with st.sidebar:
 if "docs" not in st.session_state:
     st.session_state.docs = None
     st.session_state.embs = None
+    st.session_state.bm25 = None
+    st.session_state.bm25_key = None
+    st.session_state.embs_key = None  # (ingest key, embedded, pending) the in-progress index was built for
+    st.session_state.pages_key = None
     st.session_state.pdf_text = ""
+    st.session_state.pdf_pages = None
+
+if "ingest_cache" not in st.session_state:
+    st.session_state.ingest_cache = {}
+    st.session_state.ingest_job = None
 
 if "history" not in st.session_state:
     st.session_state.history = []
 
+# Per-stage timings of this session (also fed into the process-wide tracer)
+if "tracer" not in st.session_state:
+    st.session_state.tracer = Tracer(parent=PROCESS_TRACER)
+tracer = st.session_state.tracer
+
+# Which cascade tier produced the final answer, per question
+if "cascade_tier_counts" not in st.session_state:
+    st.session_state.cascade_tier_counts = {"gpt35": 0, "gpt4o": 0, "improved": 0}
+
 # Conversation memory system
 if "conversation_memory" not in st.session_state:
     st.session_state.conversation_memory = []
@@ -1174,123 +1172,121 @@ if "user_preferences" not in st.session_state:
         }
     }
 
-def read_pdf(file) -> str:
-    """Read PDF"""
-    text = ""
-    reader = PdfReader(file)
-    for page in reader.pages:
-        page_text = page.extract_text()
-        if page_text:
-            text += page_text + "\n"
-    return text
-
-def chunk_text(text: str, chunk_size: int = 200, overlap: int = 50):
-    """Text chunking"""
-    words = text.split()
-    chunks = []
-    start = 0
-    while start < len(words):
-        chunk = " ".join(words[start : start + chunk_size])
-        chunks.append(chunk)
-        start += chunk_size - overlap
-    return chunks
-
-def get_context(question: str, docs: list, embs: list) -> str:
-    """Generate context"""
-    if not docs or not embs:
-        return ""
-    
-    # Simple keyword matching
-    question_words = set(question.lower().split())
-    best_chunks = []
-    
-    for i, doc in enumerate(docs[:5]):  # Max 5 chunks only
-        doc_words = set(doc.lower().split())
-        overlap = len(question_words.intersection(doc_words))
-        if overlap > 0:
-            best_chunks.append(doc)
-    
-    return "\n\n".join(best_chunks[:3]) if best_chunks else docs[0] if docs else ""
-
-def analyze_answer_quality(answer: str, question: str) -> dict:
-    """Analyze answer quality"""
-    if not answer or len(answer.strip()) < 10:
-        return {'score': 0, 'issues': ['Answer is too short'], 'level': 'bad'}
-    
-    score = 0
-    issues = []
-    
-    # 1. Length score (max 25 points)
-    length_score = min(len(answer) / 100, 25)
-    score += length_score
-    
-    # 2. Specificity score (max 25 points)
-    specific_words = ['example', 'specifically', 'for instance', 'first', 'second', 'third', 'also', 'however', 'therefore']
-    specificity_count = sum(1 for word in specific_words if word in answer)
-    specificity_score = min(specificity_count * 5, 25)
-    score += specificity_score
-    
-    # 3. Uncertainty reduction score (max 25 points)
-    uncertainty_words = ["I don't know", 'not sure', 'guess', 'maybe', 'perhaps']
-    uncertainty_count = sum(1 for word in uncertainty_words if word in answer)
-    uncertainty_score = max(0, 25 - uncertainty_count * 5)
-    score += uncertainty_score
-    
-    # 4. Keyword inclusion score (max 25 points)
-    question_words = set(re.findall(r'\w+', question.lower()))
-    answer_words = set(re.findall(r'\w+', answer.lower()))
-    keyword_overlap = len(question_words.intersection(answer_words))
-    keyword_score = min(keyword_overlap * 3, 25)
-    score += keyword_score
-    
-    # Issue identification
-    if length_score < 10:
-        issues.append('Answer is too short')
-    if specificity_score < 10:
-        issues.append('Lacks specific examples')
-    if uncertainty_score < 15:
-        issues.append('Too many uncertain expressions')
-    if keyword_score < 10:
-        issues.append('Low relevance to question')
-    
-    # Determine level
-    if score >= 80:
-        level = 'good'
-    elif score >= 60:
-        level = 'medium'
-    else:
-        level = 'bad'
-    
-    return {
-        'score': round(score, 1),
-        'issues': issues,
-        'level': level
-    }
+# Embedding model and ingestion cache settings
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "50000"))  # Per request, below the 300k provider limit
+EMBEDDING_BATCH_ITEMS = 2048
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))  # Batch requests in flight
+EMBEDDING_PRECISION = os.getenv("EMBEDDING_PRECISION", "int8")  # int8 or float32 (float16 scores ~10x slower)
+INGEST_CACHE_MAX_ENTRIES = 5  # PDFs kept per session
+
+def make_ingest_key(file_bytes: bytes, chunk_size: int, overlap: int, model: str = EMBEDDING_MODEL) -> str:
+    """Build ingestion cache key from PDF content and chunk/embedding settings"""
+    digest = hashlib.sha256(file_bytes).hexdigest()
+    return f"{digest}:{chunk_size}:{overlap}:{model}"
+
+def store_ingest_result(key: str, pdf_pages, docs: list, embs: VectorIndex, bm25: BM25Index):
+    """Save ingestion result to the session cache (oldest entry evicted first)"""
+    cache = st.session_state.ingest_cache
+    cache.pop(key, None)
+    cache[key] = {"pdf_pages": pdf_pages, "docs": docs, "embs": embs, "bm25": bm25}
+    while len(cache) > INGEST_CACHE_MAX_ENTRIES:
+        cache.pop(next(iter(cache)))
+
+@functools.lru_cache(maxsize=32)
+def embed_query(question: str) -> np.ndarray:
+    """Embed question as a normalized float32 vector"""
+    response = client.embeddings.create(model=EMBEDDING_MODEL, input=question)
+    query = np.asarray(response.data[0].embedding, dtype=np.float32)
+    norm = np.linalg.norm(query)
+    return query / norm if norm else query
+
+@st.cache_resource
+def get_embedding_cache() -> EmbeddingCache:
+    """On-disk embedding cache shared by all sessions"""
+    return EmbeddingCache()
+
+embedding_cache = get_embedding_cache()
+count_embedding_tokens = make_token_counter(EMBEDDING_MODEL)
+
+def fetch_embeddings(batch_chunks: list) -> list:
+    """Request embeddings from the API (failures are retried by the ingestion job)"""
+    response = client.embeddings.create(model=EMBEDDING_MODEL, input=batch_chunks)
+    return [embedding_data.embedding for embedding_data in response.data]
+
+def embed_batch(batch_chunks: list, tracer: Tracer = PROCESS_TRACER) -> np.ndarray:
+    """Embed a batch of chunks (runs on the ingestion thread); only cache misses hit the API"""
+    fetched = []
+    
+    def fetch(missing_chunks: list) -> list:
+        fetched.extend(missing_chunks)
+        return fetch_embeddings(missing_chunks)
+    
+    with tracer.span("embed", tokens=sum(map(count_embedding_tokens, batch_chunks))) as span:
+        vectors = embedding_cache.get_or_fetch(EMBEDDING_MODEL, batch_chunks, fetch)
+        span["cache_hit"] = 1 - len(fetched) / len(batch_chunks) if batch_chunks else None
+    return build_embedding_matrix(vectors)
+
+@st.fragment(run_every=1.0)
+def show_ingest_progress():
+    """Live ingestion progress (reruns the whole app once ingestion finishes)"""
+    job = st.session_state.ingest_job
+    if job is None:
+        return
+    if job.done:
+        st.rerun()
+    if job.error is not None:
+        st.error(f"PDF processing failed: {job.error}")
+        return
+    
+    pages_done = len(job.pages)
+    chunk_count = len(job.docs)
+    extract_percent = pages_done / job.page_count * 100 if job.page_count else 100
+    embed_percent = job.embedded / chunk_count * 100 if chunk_count else 0
+    progress_percent = (extract_percent + embed_percent) / 2
+    progress_text = f"Extracted {pages_done}/{job.page_count} pages | Embedded {job.embedded}/{chunk_count} chunks"
+    retrying = job.pending - job.failed
+    if retrying:
+        progress_text += f" | {retrying} retrying"
+    if job.failed:
+        progress_text += f" | {job.failed} failed"
+    rate = job.embedding_rate()
+    if rate > 0:
+        progress_text += f" | {rate:.1f} chunks/s"
+    
+    extract_step = 'completed' if pages_done >= job.page_count else 'active'
+    chunk_step = 'completed' if pages_done >= job.page_count else 'active' if chunk_count else ''
+    embed_step = 'active' if job.embedded else ''
+    st.markdown(f"""
+    <div class="custom-loading" style="background: linear-gradient(135deg, rgba(76, 175, 80, 0.1) 0%, rgba(129, 199, 132, 0.1) 100%); border: 1px solid rgba(76, 175, 80, 0.3);">
+        <div class="loading-spinner" style="border-color: rgba(76, 175, 80, 0.3); border-top-color: #4caf50;"></div>
+        <div class="loading-text" style="color: #4caf50;">📄 Processing PDF...</div>
+        <div class="loading-progress">
+            <div class="loading-progress-bar" style="width: {progress_percent}%; background: linear-gradient(90deg, #4caf50 0%, #66bb6a 100%);"></div>
+        </div>
+        <div class="loading-steps">
+            <div class="loading-step {extract_step}" style="background: rgba(76, 175, 80, 0.2);">1️⃣ Text Extraction</div>
+            <div class="loading-step {chunk_step}" style="background: rgba(76, 175, 80, 0.2);">2️⃣ Chunk Splitting</div>
+            <div class="loading-step {embed_step}" style="background: rgba(76, 175, 80, 0.2);">3️⃣ Embedding Generation</div>
+            <div class="loading-step {embed_step}" style="background: rgba(76, 175, 80, 0.2);">4️⃣ Vector Storage</div>
+        </div>
+        <div style="color: #d1d5db; font-size: 0.9rem;">{progress_text}</div>
+    </div>
+    """, unsafe_allow_html=True)
 
 def generate_answer(question: str, context: str, model: str) -> str:
     """Generate answer"""
     try:
-        if context:
-            prompt = f"""Please answer the question based on the following information.
-
-Reference information:
-{context}
-
-Question: {question}
-
-Answer:"""
-        else:
-            prompt = question
+        prompt = build_answer_prompt(question, context)
         
         # GPT-OSS local model handling
         if model.startswith("gpt-oss"):
-            return generate_gpt_oss_answer(question, context, model)
+            return gpt_oss_client.chat([{"role": "user", "content": prompt}], model, max_tokens=1000, temperature=0.7)
         elif model in ["gpt-3.5-turbo", "gpt-4o-mini", "gpt-4o"]:
             response = client.chat.completions.create(
                 model=model,
-                        messages=[{"role": "user", "content": prompt}],
-                max_tokens=500,
-                temperature=0.7
+                messages=[{"role": "user", "content": prompt}],
+                **ANSWER_OPTIONS
             )
             return response.choices[0].message.content
         elif model == "claude-3-5-sonnet" and claude_client:
@@ -1309,284 +1305,40 @@ Answer:"""
     except Exception as e:
         return f"Error occurred: {str(e)}"
 
-def generate_gpt_oss_answer(question: str, context: str, model: str) -> str:
-    """GPT-OSS model high-quality answer generation"""
+def stream_answer(question: str, context: str, model: str):
+    """Generate answer, yielding text deltas as they arrive"""
     try:
-        import re
-        
-        # Extract key information from context
-        context_words = context.split()
-        key_phrases = []
+        prompt = build_answer_prompt(question, context)
         
-        # Extract important keywords
-        for i, word in enumerate(context_words):
-            if len(word) > 3 and word.isalpha():
-                if i < len(context_words) - 1:
-                    phrase = f"{word} {context_words[i+1]}"
-                    key_phrases.append(phrase)
-        
-        # Question analysis
-        question_lower = question.lower()
-        
-        # Math/Science related questions
-        if any(word in question_lower for word in ['trigonometric', 'trigonometry', 'sin', 'cos', 'tan', 'angle', 'triangle']):
-            answer = f"""🔬 **Trigonometric Relationship Analysis:**
-
-**Question:** {question}
-
-**GPT-OSS Model Expert Analysis:**
-
-1. **Basic Trigonometric Relationships:**
-   - sin²θ + cos²θ = 1 (Pythagorean identity)
-   - tan θ = sin θ / cos θ
-   - cot θ = cos θ / sin θ
-
-2. **Applications in Communication Systems:**
-   - Phase analysis in signal processing
-   - Angle modulation in frequency modulation (FM)
-   - QAM (Quadrature Amplitude Modulation) in digital communications
-
-3. **Practical Application Examples:**
-   - Carrier signal generation in wireless communications
-   - Frequency analysis in audio processing
-   - Distance measurement in radar systems
-
-**Context-based Additional Information:**
-{context[:300]}...
-
-*This analysis was generated based on the advanced mathematical/communications expertise of the GPT-OSS open-source model.*"""
-
-        # Technology/Programming related questions
-        elif any(word in question_lower for word in ['code', 'programming', 'algorithm', 'function', 'api', 'database']):
-            answer = f"""💻 **Technical Analysis and Solutions:**
-
-**Question:** {question}
-
-**GPT-OSS Model Technical Expert Analysis:**
-
-1. **Core Concepts:**
-   - Problem definition and requirements analysis
-   - Optimized algorithm design
-   - Efficient implementation methods
-
-2. **Implementation Guide:**
-   ```python
-   # Example code structure
-   def optimized_solution():
-       # Step 1: Data preprocessing
-       # Step 2: Core logic implementation
-       # Step 3: Result verification
-       pass
-   ```
-
-3. **Performance Optimization Tips:**
-   - Time complexity analysis
-   - Memory usage optimization
-   - Scalability considerations
-
-**Context-based Additional Information:**
-{context[:300]}...
-
-*This analysis was generated based on the advanced programming expertise of the GPT-OSS model.*"""
-
-        # Business/Strategy related questions
-        elif any(word in question_lower for word in ['business', 'strategy', 'market', 'profit', 'customer', 'service']):
-            answer = f"""📊 **Business Strategy Analysis:**
-
-**Question:** {question}
-
-**GPT-OSS Model Strategic Analysis:**
-
-1. **Market Analysis:**
-   - Competitive environment assessment
-   - Customer needs analysis
-   - Market opportunity identification
-
-2. **Strategic Recommendations:**
-   - Differentiation strategy
-   - Price optimization
-   - Customer experience improvement
-
-3. **Execution Plan:**
-   - Step-by-step implementation roadmap
-   - Risk management
-   - Performance measurement metrics
-
-**Context-based Additional Information:**
-{context[:300]}...
-
-*This analysis was generated based on the advanced business expertise of the GPT-OSS model.*"""
-
-        # General questions
-        else:
-            # Extract meaningful sentences from context
-            sentences = re.split(r'[.!?]+', context)
-            meaningful_sentences = [s.strip() for s in sentences if len(s.strip()) > 20][:3]
-            
-            answer = f"""🤖 **GPT-OSS Advanced Analysis Results:**
-
-**Question:** {question}
-
-**Context-based Expert Analysis:**
-
-1. **Key Content Summary:**
-   {meaningful_sentences[0] if meaningful_sentences else context[:150]}...
-
-2. **In-depth Analysis:**
-   - Key points: {key_phrases[0] if key_phrases else 'Analyzed keywords'}
-   - Relevance analysis: Connection between context and question
-   - Additional considerations: Expandable perspectives
-
-3. **Practical Recommendations:**
-   - Immediately applicable insights
-   - Future development directions
-   - Areas for further research
-
-**GPT-OSS Model Advanced AI Analysis:**
-This answer was generated utilizing the advanced natural language processing and analysis capabilities of the GPT-OSS open-source model.
-It deeply understands the meaning of the context and provides comprehensive, practical answers to the question.
-
-*High-performance GPT-OSS model running directly on Streamlit Cloud.*"""
-
-        return answer
-        
-    except Exception as e:
-        return f"GPT-OSS model execution error: {str(e)}"
-
-def analyze_sentiment_and_tone(text: str) -> dict:
-    """Sentiment and tone analysis"""
-    try:
-        # Simple sentiment analysis
-        positive_words = ['good', 'excellent', 'great', 'useful', 'effective', 'successful']
-        negative_words = ['bad', 'problem', 'failure', 'difficult', 'complex', 'inconvenient']
-        
-        positive_count = sum(1 for word in positive_words if word in text)
-        negative_count = sum(1 for word in negative_words if word in text)
-        
-        if positive_count > negative_count:
-            sentiment = "Positive"
-            tone = "Friendly and encouraging"
-        elif negative_count > positive_count:
-            sentiment = "Negative"
-            tone = "Concerned and cautious"
-        else:
-            sentiment = "Neutral"
-            tone = "Objective and balanced"
-        
-        return {
-            'sentiment': sentiment,
-            'tone': tone,
-            'positive_score': positive_count,
-            'negative_score': negative_count
-        }
-    except Exception as e:
-        return {'sentiment': 'Unable to analyze', 'tone': 'Unable to analyze', 'positive_score': 0, 'negative_score': 0}
-
-def classify_topic(text: str) -> str:
-    """Topic classification"""
-    try:
-        topics = {
-            'Technology': ['programming', 'code', 'algorithm', 'database', 'API', 'development'],
-            'Business': ['management', 'strategy', 'marketing', 'revenue', 'customer', 'service'],
-            'Education': ['learning', 'education', 'lecture', 'course', 'knowledge', 'understanding'],
-            'Medical': ['diagnosis', 'treatment', 'symptom', 'medicine', 'health', 'hospital'],
-            'Legal': ['law', 'contract', 'litigation', 'rights', 'obligation', 'regulation']
-        }
-        
-        text_lower = text.lower()
-        topic_scores = {}
-        
-        for topic, keywords in topics.items():
-            score = sum(1 for keyword in keywords if keyword in text_lower)
-            topic_scores[topic] = score
-        
-        if topic_scores:
-            best_topic = max(topic_scores, key=topic_scores.get)
-            return best_topic if topic_scores[best_topic] > 0 else "General"
+        if model.startswith("gpt-oss"):
+            yield from gpt_oss_client.stream([{"role": "user", "content": prompt}], model, max_tokens=1000, temperature=0.7)
+        elif model in ["gpt-3.5-turbo", "gpt-4o-mini", "gpt-4o"]:
+            yield from stream_chat(client, model, prompt, **ANSWER_OPTIONS)
+        elif model == "claude-3-5-sonnet" and claude_client:
+            with claude_client.messages.stream(
+                model="claude-3-5-sonnet-20241022",
+                max_tokens=1000,
+                messages=[{"role": "user", "content": prompt}]
+            ) as stream:
+                yield from stream.text_stream
+        elif model == "gemini-pro" and gemini_model:
+            for chunk in gemini_model.generate_content(prompt, stream=True):
+                yield chunk.text
         else:
-            return "General"
-    except Exception as e:
-        return "General"
-
-def improve_math_readability(text: str) -> str:
-    """Improve math symbol readability"""
-    try:
-        # Convert LaTeX formulas to plain text
-        math_replacements = {
-            r'\frac{([^}]+)}{([^}]+)}': r'fraction(\1/\2)',
-            r'\sqrt{([^}]+)}': r'sqrt(\1)',
-            r'\sum_{([^}]+)}': r'sum(\1)',
-            r'\int_{([^}]+)}': r'integral(\1)',
-            r'\alpha': 'alpha',
-            r'\beta': 'beta',
-            r'\gamma': 'gamma',
-            r'\delta': 'delta',
-            r'\epsilon': 'epsilon',
-            r'\theta': 'theta',
-            r'\lambda': 'lambda',
-            r'\mu': 'mu',
-            r'\pi': 'pi',
-            r'\sigma': 'sigma',
-            r'\phi': 'phi',
-            r'\omega': 'omega'
-        }
-        
-        improved_text = text
-        for pattern, replacement in math_replacements.items():
-            improved_text = re.sub(pattern, replacement, improved_text)
-        
-        return improved_text
-    except Exception as e:
-        return text
-
-def analyze_text_keywords(text: str, top_n: int = 20) -> dict:
-    """Analyze keywords from text"""
-    try:
-        # English stop words
-        stop_words = ['the', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'shall', 'to', 'of', 'in', 'for', 'on', 'with', 'at', 'by', 'from', 'as', 'into', 'through', 'during', 'before', 'after', 'above', 'below', 'between', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why', 'how', 'all', 'each', 'every', 'both', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very', 'and', 'but', 'or', 'if', 'it', 'its', 'this', 'that', 'which', 'what', 'who']
-        
-        # Clean text
-        text_clean = re.sub(r'[^\w\s]', ' ', text)
-        words = text_clean.split()
-        
-        # Remove stop words and filter by length
-        filtered_words = [word for word in words if word not in stop_words and len(word) > 1]
-        
-        # Calculate frequency
-        word_counts = Counter(filtered_words)
+            yield f"Unsupported model or API key not configured: {model}"
         
-        # Return top keywords
-        return dict(word_counts.most_common(top_n))
     except Exception as e:
-        return {}
+        yield f"Error occurred: {str(e)}"
 
 def improve_answer_with_better_model(question: str, basic_answer: str, context: str, better_model: str, quality_analysis: dict) -> str:
     """Improve answer with a better model"""
     try:
-        # Set improvement direction based on quality analysis results
-        improvement_directions = []
-        if quality_analysis['score'] < 60:
-            improvement_directions.append("Provide a more specific and detailed answer")
-        if 'Lacks specific examples' in quality_analysis['issues']:
-            improvement_directions.append("Include specific examples")
-        if 'Too many uncertain expressions' in quality_analysis['issues']:
-            improvement_directions.append("Use confident and clear expressions")
-        
-        improvement_text = " ".join(improvement_directions) if improvement_directions else "Improve the answer to be more accurate and useful"
-        
-        prompt = f"""Please improve the following answer. Improvement direction: {improvement_text}
-
-Original question: {question}
-Context: {context}
-Current answer: {basic_answer}
-
-Improved answer:"""
+        prompt = build_improvement_prompt(question, basic_answer, context, quality_analysis)
         
         response = client.chat.completions.create(
             model=better_model,
             messages=[{"role": "user", "content": prompt}],
-            max_tokens=600,
-            temperature=0.5
+            **IMPROVEMENT_OPTIONS
         )
         
         return response.choices[0].message.content
@@ -1594,6 +1346,86 @@ Improved answer:"""
     except Exception as e:
         return f"Error occurred while improving the answer: {str(e)}"
 
+def stream_improved_answer(question: str, basic_answer: str, context: str, better_model: str, quality_analysis: dict):
+    """Improve answer with a better model, yielding text deltas as they arrive"""
+    try:
+        prompt = build_improvement_prompt(question, basic_answer, context, quality_analysis)
+        yield from stream_chat(client, better_model, prompt, **IMPROVEMENT_OPTIONS)
+        
+    except Exception as e:
+        yield f"Error occurred while improving the answer: {str(e)}"
+
+# Semantic answer cache shared by all sessions
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # Cosine similarity of questions
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))  # Seconds
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+
+@st.cache_resource
+def get_answer_cache() -> SemanticAnswerCache:
+    """Process-wide answer cache"""
+    return SemanticAnswerCache(ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL, ANSWER_CACHE_MAX_ENTRIES)
+
+answer_cache = get_answer_cache()
+
+def run_answer_stream(stream: AnswerStream, tracer: Tracer, model: str, lookup: dict) -> str:
+    """Run an answer stream on a worker thread and record its latency, TTFT, tokens and cache outcome"""
+    answer = stream.run()
+    tracer.record(f"generate:{model}", (stream.finished_at - stream.started_at) * 1000,
+                  count_embedding_tokens(answer), lookup.get("hit"))
+    if stream.ttft_ms is not None:
+        tracer.record(f"ttft:{model}", stream.ttft_ms)
+    return answer
+
+# Model calls of one question run side by side on a shared pool
+ANSWER_CONCURRENCY = int(os.getenv("ANSWER_CONCURRENCY", "8"))
+STREAM_RENDER_INTERVAL = 0.1  # Seconds between incremental card updates
+
+@st.cache_resource
+def get_answer_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by all sessions for LLM calls"""
+    return ThreadPoolExecutor(max_workers=ANSWER_CONCURRENCY, thread_name_prefix="answer")
+
+def render_answer_loading(placeholder, message: str, color: str, rgb: str):
+    """Show a loading card in an answer slot"""
+    placeholder.markdown(f"""
+    <div class="custom-loading" style="background: linear-gradient(135deg, rgba({rgb}, 0.1) 0%, rgba({rgb}, 0.05) 100%); border: 1px solid rgba({rgb}, 0.3);">
+        <div class="loading-spinner" style="border-color: rgba({rgb}, 0.3); border-top-color: {color};"></div>
+        <div class="loading-text" style="color: {color};">{message}</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+def render_answer_partial(placeholder, card: dict, text: str):
+    """Show the answer streamed so far in an answer slot"""
+    placeholder.markdown(f"""
+    <div class="{card.get('card_class', 'answer-card')}">
+        <h4>{card['title']}</h4>
+        <p>{text}▌</p>
+        <div class="model-badge {card['badge']}">
+            {card['label']}
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+def render_answer_card(placeholder, card: dict, answer: str, quality: dict, ttft_ms: float = None):
+    """Replace an answer slot's loading card with the finished answer"""
+    if card.get("step"):
+        # 3-step cards: math-friendly text and compact quality badge
+        answer = improve_math_readability(answer)
+        quality_badge = f'<div class="model-badge quality-{quality["level"]}">Quality: {quality["score"]}/100</div>'
+    else:
+        quality_badge = f'<div class="quality-badge quality-{quality["level"]}">Quality Score: {quality["score"]}/100</div>'
+    placeholder.markdown(f"""
+    <div class="{card.get('card_class', 'answer-card')}">
+        <h4>{card['title']}</h4>
+        <p>{answer}</p>
+        {quality_badge}
+        <div class="model-badge {card['badge']}">
+            {card['label']}
+        </div>
+        {f'<div class="model-badge">⚡ First token {ttft_ms:.0f} ms</div>' if ttft_ms is not None else ''}
+    </div>
+    """, unsafe_allow_html=True)
+
 # Main container - PDF upload and question features placed first
 col1, col2 = st.columns([3, 1])
 
@@ -1603,159 +1435,117 @@ with col1:
     with st.container():
         st.markdown('<div class="upload-card">', unsafe_allow_html=True)
         uploaded_file = st.file_uploader("Select a PDF file", type=['pdf'])
+        ingest_key = make_ingest_key(uploaded_file.getvalue(), chunk_size, overlap_size) if uploaded_file is not None else None
         
-        if uploaded_file is not None:
-            # Elegant loading container
-            with st.container():
-                st.markdown("""
+        if ingest_key is not None and ingest_key in st.session_state.ingest_cache:
+            # Same PDF and settings as before: reuse extracted chunks and embeddings
+            cached_ingest = st.session_state.ingest_cache[ingest_key]
+            st.session_state.pdf_pages = cached_ingest["pdf_pages"]
+            st.session_state.pdf_text = cached_ingest["pdf_pages"].text
+            st.session_state.docs = cached_ingest["docs"]
+            st.session_state.embs = cached_ingest["embs"]
+            st.session_state.bm25 = cached_ingest["bm25"]
+            st.session_state.bm25_key = ingest_key
+            st.session_state.embs_key = None
+            st.session_state.pages_key = None
+            st.markdown(f"""
+            <div style="
+                background: linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%);
+                padding: 1.5rem;
+                border-radius: 15px;
+                margin: 1rem 0;
+                box-shadow: 0 4px 20px rgba(0,0,0,0.1);
+                border-left: 4px solid #28a745;
+            ">
+                <h4 style="color: #155724; margin-bottom: 0.5rem;">✅ PDF Ready (cached)</h4>
+                <p style="color: #155724; margin: 0;">📊 {len(st.session_state.docs)} chunks | 📄 {len(st.session_state.pdf_text):,} characters analyzed</p>
+            </div>
+            """, unsafe_allow_html=True)
+        elif uploaded_file is not None:
+            ingest_job = st.session_state.ingest_job
+            if ingest_job is None or ingest_job.key != ingest_key:
+                if ingest_job is not None:
+                    ingest_job.cancel()
+                ingest_job = IngestJob(
+                    ingest_key, uploaded_file.getvalue(), functools.partial(embed_batch, tracer=tracer),
+                    chunk_size, overlap_size,
+                    max_batch_tokens=EMBEDDING_BATCH_TOKENS, max_batch_items=EMBEDDING_BATCH_ITEMS,
+                    count_tokens=count_embedding_tokens,
+                    concurrency=EMBEDDING_CONCURRENCY, tracer=tracer
+                ).start()
+                st.session_state.ingest_job = ingest_job
+            
+            # Streamed chunks are queryable right away (keyword-only until embedded)
+            # Counts read before the snapshot, so a racing batch only causes one extra rebuild
+            embs_key = (ingest_key, ingest_job.embedded, ingest_job.pending)
+            pages_key = (ingest_key, len(ingest_job.pages))
+            docs, matrix, pending = ingest_job.snapshot()
+            st.session_state.docs = docs
+            # Re-quantize only when new vectors arrived (not on every progress refresh)
+            if st.session_state.embs_key != embs_key:
+                st.session_state.embs = VectorIndex(matrix, EMBEDDING_PRECISION, pending) if matrix is not None else None
+                st.session_state.embs_key = embs_key
+            # Index only the chunks that arrived since the last rerun
+            if st.session_state.bm25_key != ingest_key:
+                st.session_state.bm25 = BM25Index()
+                st.session_state.bm25_key = ingest_key
+            st.session_state.bm25.add(docs[len(st.session_state.bm25):])
+            if st.session_state.pages_key != pages_key:
+                st.session_state.pdf_pages = ingest_job.pdf_pages()
+                st.session_state.pdf_text = st.session_state.pdf_pages.text
+                st.session_state.pages_key = pages_key
+            
+            if not ingest_job.done:
+                # Elegant loading container
+                with st.container():
+                    st.markdown("""
+                    <div style="
+                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                        padding: 2rem;
+                        border-radius: 15px;
+                        text-align: center;
+                        color: white;
+                        margin: 1rem 0;
+                        box-shadow: 0 8px 32px rgba(0,0,0,0.1);
+                    ">
+                        <div style="
+                            width: 60px;
+                            height: 60px;
+                            border: 4px solid rgba(255,255,255,0.3);
+                            border-top: 4px solid white;
+                            border-radius: 50%;
+                            animation: spin 1s linear infinite;
+                            margin: 0 auto 1rem auto;
+                        "></div>
+                        <h3>📄 Analyzing PDF...</h3>
+                        <p>You can already ask questions about the pages processed so far</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    show_ingest_progress()
+            elif ingest_job.error is not None:
+                st.error(f"PDF processing failed: {ingest_job.error}")
+            elif st.session_state.docs:
+                if ingest_job.failed:
+                    st.warning(f"⚠️ {ingest_job.failed} chunks could not be embedded and are excluded from semantic search.")
+                else:
+                    store_ingest_result(ingest_key, st.session_state.pdf_pages, st.session_state.docs, st.session_state.embs, st.session_state.bm25)
+                    # The cache now holds the compact index; drop the job's float32 copy
+                    st.session_state.ingest_job = None
+                
+                # Completion message
+                st.markdown(f"""
                 <div style="
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    padding: 2rem;
+                    background: linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%);
+                    padding: 1.5rem;
                     border-radius: 15px;
-                    text-align: center;
-                    color: white;
                     margin: 1rem 0;
-                    box-shadow: 0 8px 32px rgba(0,0,0,0.1);
+                    box-shadow: 0 4px 20px rgba(0,0,0,0.1);
+                    border-left: 4px solid #28a745;
                 ">
-                    <div style="
-                        width: 60px;
-                        height: 60px;
-                        border: 4px solid rgba(255,255,255,0.3);
-                        border-top: 4px solid white;
-                        border-radius: 50%;
-                        animation: spin 1s linear infinite;
-                        margin: 0 auto 1rem auto;
-                    "></div>
-                    <h3>📄 Analyzing PDF...</h3>
-                    <p>Preparing text extraction and AI learning</p>
+                    <h4 style="color: #155724; margin-bottom: 0.5rem;">✅ PDF Processing Complete!</h4>
+                    <p style="color: #155724; margin: 0;">📊 {len(st.session_state.docs)} chunks created | 📄 {len(st.session_state.pdf_text):,} characters analyzed</p>
                 </div>
                 """, unsafe_allow_html=True)
-                
-                pdf_text = read_pdf(uploaded_file)
-                if pdf_text:
-                    st.session_state.pdf_text = pdf_text
-                    
-                    # Chunking and embedding generation
-                    chunks = chunk_text(pdf_text, chunk_size, overlap_size)
-                    
-                    if chunks:
-                        # Embedding generation
-                        embeddings = []
-                        
-                        # Progress display
-                        progress_container = st.container()
-                        with progress_container:
-                            st.markdown("""
-                            <div style="
-                                background: white;
-                                padding: 1.5rem;
-                                border-radius: 15px;
-                                margin: 0;
-                                box-shadow: 0 4px 20px rgba(0,0,0,0.1);
-                            ">
-                                <h4 style="color: #333; margin-bottom: 1rem;">🤖 AI Learning Progress</h4>
-                                <div style="
-                                    background: #e9ecef;
-                                    border-radius: 10px;
-                                    height: 20px;
-                                    overflow: hidden;
-                                    margin-bottom: 0.5rem;
-                                ">
-                                    <div id="progress-bar" style="
-                                        background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
-                                        height: 100%;
-                                        width: 0%;
-                                        transition: width 0.3s ease;
-                                        border-radius: 10px;
-                                    "></div>
-                                </div>
-                                <p id="progress-text" style="color: #666; margin: 0; font-size: 0.9rem;">Chunking text...</p>
-                                <p id="time-estimate" style="color: #666; margin: 0; font-size: 0.8rem;">Estimated time: Calculating...</p>
-                            </div>
-                            """, unsafe_allow_html=True)
-                        
-                        # Calculate batch size (optimization for large files)
-                        batch_size = min(50, max(10, len(chunks) // 20))  # Adjust batch size based on chunk count
-                        
-                        # Estimate time calculation
-                        estimated_time_per_chunk = 0.5  # About 2 chunks per second
-                        total_estimated_time = len(chunks) * estimated_time_per_chunk / 60  # In minutes
-                        
-                        st.markdown(f"""
-                        <script>
-                            document.getElementById('time-estimate').textContent = 'Estimated time: about {total_estimated_time:.1f} min';
-                        </script>
-                        """, unsafe_allow_html=True)
-                        
-                        # Generate embeddings with batch processing
-                        for i in range(0, len(chunks), batch_size):
-                            batch_chunks = chunks[i:i + batch_size]
-                            
-                            try:
-                                # Generate embeddings in batch (faster)
-                                response = client.embeddings.create(
-                                    model="text-embedding-3-small",
-                                    input=batch_chunks
-                                )
-                                
-                                # Separate batch results into individual embeddings
-                                for embedding_data in response.data:
-                                    emb = np.array(embedding_data.embedding)
-                                    embeddings.append(emb)
-                                    
-                            except Exception as e:
-                                # Fallback to individual processing on error
-                                for chunk in batch_chunks:
-                                    try:
-                                        response = client.embeddings.create(
-                                            model="text-embedding-3-small",
-                                            input=chunk
-                                        )
-                                        emb = np.array(response.data[0].embedding)
-                                        embeddings.append(emb)
-                                    except Exception:
-                                        embeddings.append(np.zeros(1536))
-                            
-                            # Progress update
-                            progress_percent = (i + len(batch_chunks)) / len(chunks) * 100
-                            progress_text = f"Processing chunk {i + len(batch_chunks)}/{len(chunks)}... ({progress_percent:.1f}%)"
-                            
-                            # Update every 10% (reduce frequency)
-                            if (i + len(batch_chunks)) % max(1, len(chunks) // 10) == 0 or i + len(batch_chunks) >= len(chunks):
-                                                            st.markdown(f"""
-                            <div class="custom-loading" style="background: linear-gradient(135deg, rgba(76, 175, 80, 0.1) 0%, rgba(129, 199, 132, 0.1) 100%); border: 1px solid rgba(76, 175, 80, 0.3);">
-                                <div class="loading-spinner" style="border-color: rgba(76, 175, 80, 0.3); border-top-color: #4caf50;"></div>
-                                <div class="loading-text" style="color: #4caf50;">📄 Processing PDF...</div>
-                                <div class="loading-progress">
-                                    <div class="loading-progress-bar" style="width: {progress_percent}%; background: linear-gradient(90deg, #4caf50 0%, #66bb6a 100%);"></div>
-                                </div>
-                                <div class="loading-steps">
-                                    <div class="loading-step {'completed' if progress_percent > 20 else 'active' if progress_percent > 0 else ''}" style="background: rgba(76, 175, 80, 0.2);">1️⃣ Text Extraction</div>
-                                    <div class="loading-step {'completed' if progress_percent > 40 else 'active' if progress_percent > 20 else ''}" style="background: rgba(76, 175, 80, 0.2);">2️⃣ Chunk Splitting</div>
-                                    <div class="loading-step {'completed' if progress_percent > 60 else 'active' if progress_percent > 40 else ''}" style="background: rgba(76, 175, 80, 0.2);">3️⃣ Embedding Generation</div>
-                                    <div class="loading-step {'completed' if progress_percent > 80 else 'active' if progress_percent > 60 else ''}" style="background: rgba(76, 175, 80, 0.2);">4️⃣ Vector Storage</div>
-                                </div>
-                                <div style="color: #d1d5db; font-size: 0.9rem;">{progress_text}</div>
-                            </div>
-                            """, unsafe_allow_html=True)
-                        
-                        st.session_state.docs = chunks
-                        st.session_state.embs = embeddings
-                        
-                        # Completion message
-                        st.markdown(f"""
-                        <div style="
-                            background: linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%);
-                            padding: 1.5rem;
-                            border-radius: 15px;
-                            margin: 1rem 0;
-                            box-shadow: 0 4px 20px rgba(0,0,0,0.1);
-                            border-left: 4px solid #28a745;
-                        ">
-                            <h4 style="color: #155724; margin-bottom: 0.5rem;">✅ PDF Processing Complete!</h4>
-                            <p style="color: #155724; margin: 0;">📊 {len(st.session_state.docs) if st.session_state.docs else 0} chunks created | 📄 {len(st.session_state.pdf_text) if st.session_state.pdf_text else 0:,} characters analyzed</p>
-                        </div>
-                        """, unsafe_allow_html=True)
         st.markdown('</div>', unsafe_allow_html=True)
         
 with col2:
@@ -1780,7 +1570,9 @@ with col2:
         if st.session_state.history:
             total_questions = len(st.session_state.history)
             avg_gpt35_quality = sum(entry.get('gpt35_quality', 0) for entry in st.session_state.history) / total_questions
-            avg_gpt4o_quality = sum(entry.get('gpt4o_quality', 0) for entry in st.session_state.history) / total_questions
+            # The cascade skips GPT-4o (quality None) when GPT-3.5 passes the gate; average only where it ran
+            gpt4o_scores = [entry['gpt4o_quality'] for entry in st.session_state.history if entry.get('gpt4o_quality') is not None]
+            avg_gpt4o_quality = f"{sum(gpt4o_scores) / len(gpt4o_scores):.1f}" if gpt4o_scores else "–"
             
             st.markdown(f"""
             <div class="metric-card">
@@ -1800,7 +1592,7 @@ with col2:
             st.markdown(f"""
             <div class="metric-card">
                 <h4>🚀 Avg GPT-4o Quality</h4>
-                <h2>{avg_gpt4o_quality:.1f}</h2>
+                <h2>{avg_gpt4o_quality}</h2>
                 <p>/100</p>
             </div>
             """, unsafe_allow_html=True)
@@ -1901,17 +1693,28 @@ with st.container():
                 </div>
                 """, unsafe_allow_html=True)
     
-                # Create context including conversation history
+                # Create context including conversation history (left out while answers are cached and shared)
                 conversation_context = ""
-                if st.session_state.conversation_history:
+                if st.session_state.conversation_history and not use_caching:
                     recent_conversations = st.session_state.conversation_history[-6:]  # Recent 3 pairs of conversation
                     conversation_context = "\n\n".join([
                         f"{'User' if role == 'user' else 'AI'}: {message}" 
                         for role, message, _ in recent_conversations
                     ])
                 
-                # Get PDF context
-                pdf_context = get_context(question, st.session_state.docs, st.session_state.embs) if rag_enabled and st.session_state.docs else ""
+                # Get PDF context (vector + BM25 hybrid retrieval)
+                retrieval = None
+                if rag_enabled and st.session_state.docs:
+                    query_cache_hits = embed_query.cache_info().hits
+                    with tracer.span("retrieval"):
+                        retrieval = hybrid_search(
+                            question, st.session_state.docs, st.session_state.embs, st.session_state.bm25,
+                            embed_query, top_k=top_docs
+                        )
+                    for stage, ms in retrieval["timings"].items():
+                        cache_hit = embed_query.cache_info().hits > query_cache_hits if stage == "embed_query" else None
+                        tracer.record(f"retrieval:{stage}", ms, cache_hit=cache_hit)
+                pdf_context = "\n\n".join(hit["text"] for hit in retrieval["results"]) if retrieval else ""
                 
                 # Combined context (conversation history + PDF context)
                 if ai_mode:
@@ -1924,136 +1727,65 @@ with st.container():
                 # 3-step answer system starts
                 st.markdown('<div class="section-header">📝 3-Step Answer System</div>', unsafe_allow_html=True)
                 
-                # Step 1: GPT-3.5 answer
-                with st.container():
-                    st.markdown("""
-                    <div class="custom-loading" style="background: linear-gradient(135deg, rgba(21, 101, 192, 0.1) 0%, rgba(30, 136, 229, 0.1) 100%); border: 1px solid rgba(21, 101, 192, 0.3);">
-                        <div class="loading-spinner" style="border-color: rgba(21, 101, 192, 0.3); border-top-color: #1565c0;"></div>
-                        <div class="loading-text" style="color: #1565c0;">🤖 Generating GPT-3.5 answer...</div>
-                        <div class="loading-steps">
-                            <div class="loading-step active" style="background: rgba(21, 101, 192, 0.2);">1️⃣ Question Analysis</div>
-                            <div class="loading-step" style="background: rgba(21, 101, 192, 0.2);">2️⃣ Context Search</div>
-                            <div class="loading-step" style="background: rgba(21, 101, 192, 0.2);">3️⃣ Answer Generation</div>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
+                # Every independent model call is dispatched at once; each card fills in as its call finishes
+                answer_cards = {
+                    "gpt35": {"title": "🤖 GPT-3.5 Answer (Step 1)", "badge": "model-gpt35", "label": "GPT-3.5 Turbo", "step": True},
+                    "gpt4o": {"title": "🚀 GPT-4o Answer (Step 2)", "badge": "model-gpt4o", "label": "GPT-4o", "step": True},
+                    "improved": {"title": "✨ Improved Answer (Step 3)", "badge": "model-gpt4o", "label": "GPT-4o (Improved)", "step": True, "card_class": "improved-card"},
+                    "gpt4mini": {"title": "🚀 GPT-4o-mini Answer", "badge": "model-gpt4mini", "label": "GPT-4o Mini"},
+                    "gpt4": {"title": "🚀 GPT-4o Answer", "badge": "model-gpt4o", "label": "GPT-4o"},
+                    "gpt_oss_20b": {"title": "💻 GPT-OSS-20B Answer (Free Local)", "badge": "model-gptoss", "label": "GPT-OSS-20B (Free)"},
+                    "gpt_oss_120b": {"title": "🚀 GPT-OSS-120B Answer (High-performance Free)", "badge": "model-gptoss", "label": "GPT-OSS-120B (Free)"},
+                }
+                answer_executor = get_answer_executor()
                 
-                gpt35_answer = generate_answer(question, context, "gpt-3.5-turbo")
-                gpt35_quality = analyze_answer_quality(gpt35_answer, question)
+                # Similar questions reuse cached answers for the same document and retrieved chunks
+                document_key = st.session_state.bm25_key if retrieval and not ai_mode else None
+                chunk_ids = [hit["index"] for hit in retrieval["results"]] if document_key else ()
+                fingerprint = answer_fingerprint(document_key, chunk_ids, top_docs)
+                question_embedding = None
+                if use_caching:
+                    try:
+                        question_embedding = embed_query(question)
+                    except Exception:
+                        question_embedding = None
+                answer_slots = {}
+                answer_futures = {}
+                answer_streams = {}
+                answers = {}
+                qualities = {}
+                # Each text is tokenized once and shared by every analyzer
+                analyzed_question = AnalyzedText(question)
+                analyzed_answers = {}
                 
-                with st.container():
-                    # Improve math symbol readability
-                    improved_gpt35_answer = improve_math_readability(gpt35_answer)
-                    st.markdown(f"""
-                    <div class="answer-card">
-                        <h4>🤖 GPT-3.5 Answer (Step 1)</h4>
-                        <p>{improved_gpt35_answer}</p>
-                        <div class="model-badge quality-{gpt35_quality['level']}">
-                            Quality: {gpt35_quality['score']}/100
-                        </div>
-                        <div class="model-badge model-gpt35">
-                            GPT-3.5 Turbo
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
+                def dispatch_answer(slot: str, message: str, color: str, rgb: str, cache_model: str, stream_fn, *args):
+                    render_answer_loading(answer_slots[slot], message, color, rgb)
+                    lookup = {}
+                    deltas = cached_answer_stream(answer_cache, stream_fn(*args), fingerprint, cache_model, question_embedding, lookup)
+                    answer_streams[slot] = AnswerStream(deltas)
+                    future = answer_executor.submit(run_answer_stream, answer_streams[slot], tracer, cache_model, lookup)
+                    answer_futures[future] = slot
                 
-                # Step 2: GPT-4o answer
-                with st.container():
-                    st.markdown("""
-                    <div style="
-                        background: linear-gradient(135deg, #e8f5e8 0%, #c8e6c9 100%);
-                        padding: 1.5rem;
-                        border-radius: 15px;
-                        text-align: center;
-                        color: #2e7d32;
-                        margin: 1rem 0;
-                        box-shadow: 0 4px 20px rgba(0,0,0,0.1);
-                    ">
-                        <div style="
-                            width: 40px;
-                            height: 40px;
-                            border: 3px solid rgba(46, 125, 50, 0.3);
-                            border-top: 3px solid #2e7d32;
-                            border-radius: 50%;
-                            animation: spin 1s linear infinite;
-                            margin: 0 auto 0.5rem auto;
-                        "></div>
-                        <p style="margin: 0; font-weight: 600;">🚀 Analyzing with GPT-4o...</p>
-                    </div>
-                    """, unsafe_allow_html=True)
+                def dispatch_step(step: str):
+                    if step == "gpt35":
+                        dispatch_answer("gpt35", "🤖 Generating GPT-3.5 answer...", "#1565c0", "21, 101, 192", "gpt-3.5-turbo",
+                                        stream_answer, question, context, "gpt-3.5-turbo")
+                    elif step == "gpt4o":
+                        dispatch_answer("gpt4o", "🚀 Analyzing with GPT-4o...", "#2e7d32", "46, 125, 50", "gpt-4o",
+                                        stream_answer, question, context, "gpt-4o")
+                    else:
+                        # Improve based on the better answer
+                        base_slot = improvement_base(qualities)
+                        dispatch_answer("improved", "✨ Improving answer quality...", "#856404", "133, 100, 4", "gpt-4o (improved)",
+                                        stream_improved_answer,
+                                        question, answers[base_slot], context, "gpt-4o", qualities[base_slot])
                 
-                gpt4o_answer = generate_answer(question, context, "gpt-4o")
-                gpt4o_quality = analyze_answer_quality(gpt4o_answer, question)
-                
-                with st.container():
-                    # Improve math symbol readability
-                    improved_gpt4o_answer = improve_math_readability(gpt4o_answer)
-                    st.markdown(f"""
-                    <div class="answer-card">
-                        <h4>🚀 GPT-4o Answer (Step 2)</h4>
-                        <p>{improved_gpt4o_answer}</p>
-                        <div class="model-badge quality-{gpt4o_quality['level']}">
-                            Quality: {gpt4o_quality['score']}/100
-                        </div>
-                        <div class="model-badge model-gpt4o">
-                            GPT-4o
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                # Step 3: Improved answer (when quality is low)
-                improved_answer = None
-                improved_quality = None
-                
-                if gpt35_quality['score'] < 70 or gpt4o_quality['score'] < 70:
-                    with st.container():
-                        st.markdown("""
-                        <div style="
-                            background: linear-gradient(135deg, #fff3cd 0%, #ffeaa7 100%);
-                            padding: 1.5rem;
-                            border-radius: 15px;
-                            text-align: center;
-                            color: #856404;
-                            margin: 1rem 0;
-                            box-shadow: 0 4px 20px rgba(0,0,0,0.1);
-                        ">
-                            <div style="
-                                width: 40px;
-                                height: 40px;
-                                border: 3px solid rgba(133, 100, 4, 0.3);
-                                border-top: 3px solid #856404;
-                                border-radius: 50%;
-                                animation: spin 1s linear infinite;
-                                margin: 0 auto 0.5rem auto;
-                            "></div>
-                            <p style="margin: 0; font-weight: 600;">✨ Improving answer quality...</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    # Improve based on the better answer
-                    base_answer = gpt4o_answer if gpt4o_quality['score'] > gpt35_quality['score'] else gpt35_answer
-                    base_quality = gpt4o_quality if gpt4o_quality['score'] > gpt35_quality['score'] else gpt35_quality
-                    
-                    improved_answer = improve_answer_with_better_model(
-                        question, base_answer, context, "gpt-4o", base_quality
-                    )
-                    improved_quality = analyze_answer_quality(improved_answer, question)
-                    
-                    with st.container():
-                        # Improve math symbol readability
-                        improved_final_answer = improve_math_readability(improved_answer)
-                        st.markdown(f"""
-                        <div class="improved-card">
-                            <h4>✨ Improved Answer (Step 3)</h4>
-                            <p>{improved_final_answer}</p>
-                                                    <div class="model-badge quality-{improved_quality['level']}">
-                            Quality: {improved_quality['score']}/100
-                        </div>
-                            <div class="model-badge model-gpt4o">
-                                GPT-4o (Improved)
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
+                # Step 1 and Step 2 run concurrently; the cascade starts Step 2 only if Step 1 falls short
+                # Step 3 (when quality is low) starts as soon as the answers it depends on are in
+                for step in ("gpt35", "gpt4o", "improved"):
+                    answer_slots[step] = st.empty()
+                for step in first_steps(use_cascade):
+                    dispatch_step(step)
                 
                 # Automatic model selection (additional feature)
                 if model_selection_mode == "Auto Select (Recommended)":
@@ -2072,243 +1804,67 @@ with st.container():
                     """, unsafe_allow_html=True)
                     
                     # Generate answer with auto-selected model
-                    auto_answer = generate_answer(question, context, selected_model)
-                    auto_quality = analyze_answer_quality(auto_answer, question)
-                    
-                    # Display auto-selected answer
-                    with st.container():
-                        st.markdown(f"""
-                        <div class="answer-card">
-                            <h4>🤖 {MODELS[selected_model]['name']} Answer (Auto-selected)</h4>
-                            <p>{auto_answer}</p>
-                            <div class="quality-badge quality-{auto_quality['level']}">
-                                Quality Score: {auto_quality['score']}/100
-                            </div>
-                            <div class="model-badge {MODELS[selected_model]['color']}">
-                                {MODELS[selected_model]['name']}
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
+                    answer_cards["auto"] = {
+                        "title": f"🤖 {MODELS[selected_model]['name']} Answer (Auto-selected)",
+                        "badge": MODELS[selected_model]['color'],
+                        "label": MODELS[selected_model]['name'],
+                    }
+                    answer_slots["auto"] = st.empty()
+                    dispatch_answer("auto", f"🤖 Analyzing with {MODELS[selected_model]['name']}...", "#9c27b0", "156, 39, 176", selected_model,
+                                    stream_answer, question, context, selected_model)
         
                 # Manual selection models
                 if model_selection_mode == "Manual Select":
-                    if use_gpt4mini:
-                        with st.container():
-                            st.markdown("""
-                            <div style="
-                                background: linear-gradient(135deg, #f3e5f5 0%, #e1bee7 100%);
-                                padding: 1.5rem;
-                                border-radius: 15px;
-                                text-align: center;
-                                color: #7b1fa2;
-                                margin: 1rem 0;
-                                box-shadow: 0 4px 20px rgba(0,0,0,0.1);
-                            ">
-                                <div style="
-                                    width: 40px;
-                                    height: 40px;
-                                    border: 3px solid rgba(123, 31, 162, 0.3);
-                                    border-top: 3px solid #7b1fa2;
-                                    border-radius: 50%;
-                                    animation: spin 1s linear infinite;
-                                    margin: 0 auto 0.5rem auto;
-                                "></div>
-                                <p style="margin: 0; font-weight: 600;">🚀 Analyzing with GPT-4o-mini...</p>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                            gpt4mini_answer = generate_answer(question, context, "gpt-4o-mini")
-                            gpt4mini_quality = analyze_answer_quality(gpt4mini_answer, question)
-                            
-                            with st.container():
-                                st.markdown(f"""
-                                <div class="answer-card">
-                                    <h4>🚀 GPT-4o-mini Answer</h4>
-                                    <p>{gpt4mini_answer}</p>
-                                    <div class="quality-badge quality-{gpt4mini_quality['level']}">
-                                        Quality Score: {gpt4mini_quality['score']}/100
-                                    </div>
-                                    <div class="model-badge model-gpt4mini">
-                                        GPT-4o Mini
-                                    </div>
-                                </div>
-                                """, unsafe_allow_html=True)
-                    
-                    if use_gpt4:
-                        with st.container():
-                            st.markdown("""
-                            <div style="
-                                background: linear-gradient(135deg, #e8f5e8 0%, #c8e6c9 100%);
-                                padding: 1.5rem;
-                                border-radius: 15px;
-                                text-align: center;
-                                color: #2e7d32;
-                                margin: 1rem 0;
-                                box-shadow: 0 4px 20px rgba(0,0,0,0.1);
-                            ">
-                                <div style="
-                                    width: 40px;
-                                    height: 40px;
-                                    border: 3px solid rgba(46, 125, 50, 0.3);
-                                    border-top: 3px solid #2e7d32;
-                                    border-radius: 50%;
-                                    animation: spin 1s linear infinite;
-                                    margin: 0 auto 0.5rem auto;
-                                "></div>
-                                <p style="margin: 0; font-weight: 600;">🚀 Analyzing with GPT-4o...</p>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                            gpt4_answer = generate_answer(question, context, "gpt-4o")
-                            gpt4_quality = analyze_answer_quality(gpt4_answer, question)
-                            
-                            with st.container():
-                                st.markdown(f"""
-                                <div class="answer-card">
-                                    <h4>🚀 GPT-4o Answer</h4>
-                                    <p>{gpt4_answer}</p>
-                                    <div class="quality-badge quality-{gpt4_quality['level']}">
-                                        Quality Score: {gpt4_quality['score']}/100
-                                    </div>
-                                    <div class="model-badge model-gpt4o">
-                                        GPT-4o
-                                    </div>
-                                </div>
-                                """, unsafe_allow_html=True)
-                    
-                    if use_gpt_oss_20b:
-                        with st.container():
-                            st.markdown("""
-                            <div style="
-                                background: linear-gradient(135deg, #fff3e0 0%, #ffcc02 100%);
-                                padding: 1.5rem;
-                                border-radius: 15px;
-                                text-align: center;
-                                color: #e65100;
-                                margin: 1rem 0;
-                                box-shadow: 0 4px 20px rgba(0,0,0,0.1);
-                            ">
-                                <div style="
-                                    width: 40px;
-                                    height: 40px;
-                                    border: 3px solid rgba(230, 81, 0, 0.3);
-                                    border-top: 3px solid #e65100;
-                                    border-radius: 50%;
-                                    animation: spin 1s linear infinite;
-                                    margin: 0 auto 0.5rem auto;
-                                "></div>
-                                <p style="margin: 0; font-weight: 600;">💻 Analyzing with GPT-OSS-20B...</p>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                            gpt_oss_20b_answer = generate_answer(question, context, "gpt-oss-20b")
-                            gpt_oss_20b_quality = analyze_answer_quality(gpt_oss_20b_answer, question)
-                            
-                            with st.container():
-                                st.markdown(f"""
-                                <div class="answer-card">
-                                    <h4>💻 GPT-OSS-20B Answer (Free Local)</h4>
-                                    <p>{gpt_oss_20b_answer}</p>
-                                    <div class="quality-badge quality-{gpt_oss_20b_quality['level']}">
-                                        Quality Score: {gpt_oss_20b_quality['score']}/100
-                                    </div>
-                                    <div class="model-badge model-gptoss">
-                                        GPT-OSS-20B (Free)
-                                    </div>
-                                </div>
-                                """, unsafe_allow_html=True)
-                    
-                    if use_gpt_oss_120b:
-                        with st.container():
-                            st.markdown("""
-                            <div style="
-                                background: linear-gradient(135deg, #e3f2fd 0%, #2196f3 100%);
-                                padding: 1.5rem;
-                                border-radius: 15px;
-                                text-align: center;
-                                color: #1565c0;
-                                margin: 1rem 0;
-                                box-shadow: 0 4px 20px rgba(0,0,0,0.1);
-                            ">
-                                <div style="
-                                    width: 40px;
-                                    height: 40px;
-                                    border: 3px solid rgba(21, 101, 192, 0.3);
-                                    border-top: 3px solid #1565c0;
-                                    border-radius: 50%;
-                                    animation: spin 1s linear infinite;
-                                    margin: 0 auto 0.5rem auto;
-                                "></div>
-                                <p style="margin: 0; font-weight: 600;">🚀 Analyzing with GPT-OSS-120B...</p>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                            gpt_oss_120b_answer = generate_answer(question, context, "gpt-oss-120b")
-                            gpt_oss_120b_quality = analyze_answer_quality(gpt_oss_120b_answer, question)
-                            
-                            with st.container():
-                                st.markdown(f"""
-                                <div class="answer-card">
-                                    <h4>🚀 GPT-OSS-120B Answer (High-performance Free)</h4>
-                                    <p>{gpt_oss_120b_answer}</p>
-                                    <div class="quality-badge quality-{gpt_oss_120b_quality['level']}">
-                                        Quality Score: {gpt_oss_120b_quality['score']}/100
-                                    </div>
-                                    <div class="model-badge model-gptoss">
-                                        GPT-OSS-120B (Free)
-                                    </div>
-                                </div>
-                                """, unsafe_allow_html=True)
-                
-                # Hierarchical answer improvement (optional)
-                improved_answer = None
-                improved_quality = None
+                    manual_models = [
+                        (use_gpt4mini, "gpt4mini", "gpt-4o-mini", "🚀 Analyzing with GPT-4o-mini...", "#7b1fa2", "123, 31, 162"),
+                        (use_gpt4, "gpt4", "gpt-4o", "🚀 Analyzing with GPT-4o...", "#2e7d32", "46, 125, 50"),
+                        (use_gpt_oss_20b, "gpt_oss_20b", "gpt-oss-20b", "💻 Analyzing with GPT-OSS-20B...", "#e65100", "230, 81, 0"),
+                        (use_gpt_oss_120b, "gpt_oss_120b", "gpt-oss-120b", "🚀 Analyzing with GPT-OSS-120B...", "#1565c0", "21, 101, 192"),
+                    ]
+                    for enabled, slot, model, message, color, rgb in manual_models:
+                        if enabled:
+                            answer_slots[slot] = st.empty()
+                            dispatch_answer(slot, message, color, rgb, model, stream_answer, question, context, model)
                 
-                if use_hierarchical and (use_gpt4 or use_gpt4mini):
-                    with st.container():
-                        st.markdown("""
-                        <div style="
-                            background: linear-gradient(135deg, #fff3cd 0%, #ffeaa7 100%);
-                            padding: 1.5rem;
-                            border-radius: 15px;
-                            text-align: center;
-                            color: #856404;
-                            margin: 1rem 0;
-                            box-shadow: 0 4px 20px rgba(0,0,0,0.1);
-                        ">
-                            <div style="
-                                width: 40px;
-                                height: 40px;
-                                border: 3px solid rgba(133, 100, 4, 0.3);
-                                border-top: 3px solid #856404;
-                                border-radius: 50%;
-                                animation: spin 1s linear infinite;
-                                margin: 0 auto 0.5rem auto;
-                            "></div>
-                            <p style="margin: 0; font-weight: 600;">✨ Improving answer quality...</p>
-                        </div>
-                        """, unsafe_allow_html=True)
+                # Render tokens as they stream in and finished answers in completion order
+                streamed_lengths = {}
+                while answer_futures:
+                    finished, _ = wait(answer_futures, timeout=STREAM_RENDER_INTERVAL, return_when=FIRST_COMPLETED)
+                    for slot in answer_futures.values():
+                        text = answer_streams[slot].text
+                        if text and len(text) != streamed_lengths.get(slot):
+                            streamed_lengths[slot] = len(text)
+                            with tracer.span("render:partial"):
+                                render_answer_partial(answer_slots[slot], answer_cards[slot], text)
+                    for future in finished:
+                        slot = answer_futures.pop(future)
+                        answers[slot] = future.result()
+                        with tracer.span("quality"):
+                            analyzed_answers[slot] = AnalyzedText(answers[slot])
+                            qualities[slot] = analyze_answer_quality(analyzed_answers[slot], analyzed_question)
+                        with tracer.span("render"):
+                            render_answer_card(answer_slots[slot], answer_cards[slot], answers[slot], qualities[slot],
+                                               answer_streams[slot].ttft_ms)
                         
-                        better_model = "gpt-4o"
-                        improved_answer = improve_answer_with_better_model(
-                    question, basic_answer, context, better_model, quality_analysis
-                )
-                improved_quality = analyze_answer_quality(improved_answer, question)
+                        # Cascade escalation, or Step 3 once both answers are in (when quality is low)
+                        for step in next_steps(slot, qualities, use_cascade, quality_threshold):
+                            dispatch_step(step)
+                
+                gpt35_answer, gpt35_quality = answers["gpt35"], qualities["gpt35"]
+                gpt4o_answer, gpt4o_quality = answers.get("gpt4o"), qualities.get("gpt4o")
+                cascade_tier = "improved" if "improved" in answers else "gpt4o" if "gpt4o" in answers else "gpt35"
+                if use_cascade:
+                    st.session_state.cascade_tier_counts[cascade_tier] += 1
+                    tier_counts = st.session_state.cascade_tier_counts
+                    st.caption(f"🪜 Cascade (threshold {quality_threshold}): final answer from GPT-3.5 {tier_counts['gpt35']}× · "
+                               f"GPT-4o {tier_counts['gpt4o']}× · improvement {tier_counts['improved']}× this session")
+                improved_answer, improved_quality = answers.get("improved"), qualities.get("improved")
+                auto_answer, auto_quality = answers.get("auto"), qualities.get("auto")
+                gpt4mini_answer, gpt4mini_quality = answers.get("gpt4mini"), qualities.get("gpt4mini")
+                gpt4_answer, gpt4_quality = answers.get("gpt4"), qualities.get("gpt4")
+                gpt_oss_20b_answer, gpt_oss_20b_quality = answers.get("gpt_oss_20b"), qualities.get("gpt_oss_20b")
+                gpt_oss_120b_answer, gpt_oss_120b_quality = answers.get("gpt_oss_120b"), qualities.get("gpt_oss_120b")
                 
-                with st.container():
-                            st.markdown(f"""
-                            <div class="improved-card">
-                                <h4>✨ Improved Answer (GPT-4o)</h4>
-                                <p>{improved_answer}</p>
-                                <div class="quality-badge quality-{improved_quality['level']}">
-                                    Improved Quality Score: {improved_quality['score']}/100
-                                </div>
-                                <div class="model-badge model-gpt4o">
-                                    GPT-4o (Improved)
-                                </div>
-                            </div>
-                            """, unsafe_allow_html=True)
-        
                 # Advanced analysis information
                 with st.expander("📊 Advanced Analysis Info"):
                     col1, col2, col3 = st.columns(3)
@@ -2323,22 +1879,25 @@ with st.container():
                                 st.write(f"- {issue}")
                         
                         # Sentiment and tone analysis
-                        sentiment_analysis = analyze_sentiment_and_tone(gpt35_answer)
+                        sentiment_analysis = analyze_sentiment_and_tone(analyzed_answers["gpt35"])
                         st.markdown("**Sentiment Analysis**")
                         st.write(f"Sentiment: {sentiment_analysis['sentiment']}")
                         st.write(f"Tone: {sentiment_analysis['tone']}")
                     
                     with col2:
                         st.markdown("**🚀 GPT-4o Answer Analysis**")
-                        st.write(f"Score: {gpt4o_quality['score']}/100")
-                        st.write(f"Level: {gpt4o_quality['level']}")
-                        if gpt4o_quality['issues']:
-                            st.write("Issues:")
-                            for issue in gpt4o_quality['issues']:
-                                st.write(f"- {issue}")
+                        if gpt4o_quality:
+                            st.write(f"Score: {gpt4o_quality['score']}/100")
+                            st.write(f"Level: {gpt4o_quality['level']}")
+                            if gpt4o_quality['issues']:
+                                st.write("Issues:")
+                                for issue in gpt4o_quality['issues']:
+                                    st.write(f"- {issue}")
+                        else:
+                            st.write("Skipped by the cascade (GPT-3.5 answer passed)")
                         
                         # Topic classification
-                        topic = classify_topic(gpt4o_answer)
+                        topic = classify_topic(analyzed_answers["gpt4o" if gpt4o_answer else "gpt35"])
                         st.markdown("**Topic Classification**")
                         st.write(f"Topic: {topic}")
                     
@@ -2353,16 +1912,26 @@ with st.container():
                                     st.write(f"- {issue}")
                         
                         # Keyword analysis
-                        keywords = analyze_text_keywords(gpt4o_answer, top_n=10)
+                        keywords = analyze_text_keywords(analyzed_answers["gpt4o" if gpt4o_answer else "gpt35"], top_n=10)
                         if keywords:
                             st.markdown("**🔑 Key Keywords**")
                             for keyword, count in list(keywords.items())[:5]:
                                 st.write(f"• {keyword}: {count} times")
                 
+                if use_caching:
+                    cache_stats = answer_cache.stats()
+                    st.caption(f"🗄️ Answer cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                               f"({cache_stats['hit_rate']:.0%} hit rate, {cache_stats['entries']} answers cached)")
+                
                 # Context display
                 if context and rag_enabled:
                     with st.expander("📄 Context Used"):
                         st.text_area("Context", context, height=200, disabled=True)
+                        if retrieval:
+                            st.caption("Retrieval: " + " | ".join(f"{stage} {ms:.1f} ms" for stage, ms in retrieval["timings"].items()))
+                            for hit in retrieval["results"]:
+                                ranks = ", ".join(f"{name} #{rank}" for name, rank in hit["ranks"].items())
+                                st.caption(f"Chunk {hit['index']} · RRF {hit['score']:.4f} ({ranks})")
         
                         # Save to conversation history
                 current_time = time.strftime("%Y-%m-%d %H:%M:%S")
@@ -2371,7 +1940,7 @@ with st.container():
                 st.session_state.conversation_history.append(("user", question, current_time))
                 
                 # Save AI answer (use improved answer as main)
-                ai_answer = improved_answer if improved_answer else gpt4o_answer
+                ai_answer = improved_answer if improved_answer else gpt4o_answer or gpt35_answer
                 st.session_state.conversation_history.append(("ai", ai_answer, current_time))
                 
                 # Save to existing history as well
@@ -2380,7 +1949,8 @@ with st.container():
                     'gpt35_answer': gpt35_answer,
                     'gpt35_quality': gpt35_quality['score'],
                     'gpt4o_answer': gpt4o_answer,
-                    'gpt4o_quality': gpt4o_quality['score'],
+                    'gpt4o_quality': gpt4o_quality['score'] if gpt4o_quality else None,
+                    'cascade_tier': cascade_tier if use_cascade else None,
                     'improved_answer': improved_answer,
                     'improved_quality': improved_quality['score'] if improved_quality else None,
                     'auto_answer': auto_answer if model_selection_mode == "Auto Select (Recommended)" else None,
@@ -2394,6 +1964,7 @@ with st.container():
                     'gpt_oss_20b_quality': gpt_oss_20b_quality['score'] if model_selection_mode == "Manual Select" and use_gpt_oss_20b else None,
                     'gpt_oss_120b_answer': gpt_oss_120b_answer if model_selection_mode == "Manual Select" and use_gpt_oss_120b else None,
                     'gpt_oss_120b_quality': gpt_oss_120b_quality['score'] if model_selection_mode == "Manual Select" and use_gpt_oss_120b else None,
+                    'ttft_ms': {slot: stream.ttft_ms for slot, stream in answer_streams.items()},
                     'timestamp': current_time
                 }
                 st.session_state.history.append(history_entry)
@@ -2415,12 +1986,16 @@ if st.session_state.history:
                     Quality: {entry['gpt35_quality']}/100
                 </div>
                 
+            """, unsafe_allow_html=True)
+            
+            if entry['gpt4o_answer']:
+                st.markdown(f"""
                 <h4>🚀 GPT-4o Answer (Step 2)</h4>
                 <p>{entry['gpt4o_answer']}</p>
                 <div class="quality-badge quality-{'good' if entry['gpt4o_quality'] >= 80 else 'medium' if entry['gpt4o_quality'] >= 60 else 'bad'}">
                     Quality: {entry['gpt4o_quality']}/100
                 </div>
-            """, unsafe_allow_html=True)
+                """, unsafe_allow_html=True)
             
             if entry['auto_answer']:
                 st.markdown(f"""
@@ -2506,7 +2081,7 @@ with tab1:
     
     with col2:
         if st.session_state.history:
-            avg_quality = sum(entry.get('gpt4o_quality', 0) for entry in st.session_state.history) / len(st.session_state.history)
+            avg_quality = sum(entry.get('gpt4o_quality') or entry.get('gpt35_quality', 0) for entry in st.session_state.history) / len(st.session_state.history)
         else:
             avg_quality = 0
         st.markdown(f"""
@@ -2550,3 +2125,16 @@ with tab2:
 
 with tab3:
     st.markdown("Save feature coming soon!")
+
+# Per-stage latency (p50/p95) for this session and for every session of this process
+with st.sidebar:
+    with st.expander("⏱️ Performance"):
+        session_tab, process_tab = st.tabs(["This session", "Process"])
+        for tab, stage_tracer in ((session_tab, tracer), (process_tab, PROCESS_TRACER)):
+            with tab:
+                rows = stage_tracer.summary()
+                if rows:
+                    st.dataframe(rows, hide_index=True)
+                    st.caption(f"Last {len(stage_tracer)} timed calls")
+                else:
+                    st.caption("No timings yet - upload a PDF or ask a question.")
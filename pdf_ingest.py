@@ -0,0 +1,337 @@
+import heapq
+import io
+import itertools
+import os
+import queue
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PyPDF2 import PdfReader
+
+from embeddings import (
+    MAX_REQUEST_ITEMS, MAX_REQUEST_TOKENS, backoff_delay, embed_concurrently, make_token_counter, pack_batches,
+    retry_after_seconds,
+)
+
+# Below this many pages per worker, process startup costs more than it saves
+MIN_PAGES_PER_WORKER = 16
+# Page ranges handed out per worker, so the first pages stream back early
+RANGES_PER_WORKER = 4
+
+
+class PdfPages:
+    """Extracted page texts with a character offset table"""
+
+    def __init__(self, pages: list):
+        self.pages = pages
+        # offsets[i] = start of page i in the joined text (empty pages add nothing)
+        self.offsets = []
+        position = 0
+        for page_text in pages:
+            self.offsets.append(position)
+            if page_text:
+                position += len(page_text) + 1
+        self.length = position
+        self._text = None
+
+    @property
+    def text(self) -> str:
+        """Joined document text (built once, in linear time)"""
+        if self._text is None:
+            self._text = "".join(page_text + "\n" for page_text in self.pages if page_text)
+        return self._text
+
+    def page_for_offset(self, offset: int) -> int:
+        """Page index containing a character offset of the joined text"""
+        return max(0, bisect_right(self.offsets, offset) - 1)
+
+    def __len__(self):
+        return len(self.pages)
+
+
+def _read_bytes(file) -> bytes:
+    """Get raw bytes from a path, bytes or file-like object"""
+    if isinstance(file, (bytes, bytearray)):
+        return bytes(file)
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            return f.read()
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    file.seek(0)
+    return file.read()
+
+
+def _extract_page_range(data: bytes, start: int, stop: int) -> list:
+    """Extract text of pages [start, stop) (runs in a worker process)"""
+    reader = PdfReader(io.BytesIO(data))
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def iter_pdf_pages(data: bytes, max_workers: int = None):
+    """Yield page texts in order, extracting page ranges on a process pool"""
+    page_count = len(PdfReader(io.BytesIO(data)).pages)
+
+    workers = min(max_workers or os.cpu_count() or 1, page_count // MIN_PAGES_PER_WORKER)
+    if workers <= 1:
+        reader = PdfReader(io.BytesIO(data))
+        for page in reader.pages:
+            yield page.extract_text() or ""
+        return
+
+    range_count = min(workers * RANGES_PER_WORKER, page_count // MIN_PAGES_PER_WORKER)
+    bounds = [page_count * i // range_count for i in range(range_count + 1)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() yields results in submission order as each range completes
+        for page_range in pool.map(_extract_page_range, [data] * range_count, bounds[:-1], bounds[1:]):
+            yield from page_range
+
+
+def read_pdf(file, max_workers: int = None) -> PdfPages:
+    """Read PDF pages, spreading page ranges across a process pool"""
+    return PdfPages(list(iter_pdf_pages(_read_bytes(file), max_workers)))
+
+
+def iter_chunks(texts, chunk_size: int = 200, overlap: int = 50):
+    """Yield overlapping word-window chunks from a stream of texts"""
+    step = max(1, chunk_size - overlap)
+    window = []
+    for text in texts:
+        window.extend(text.split())
+        while len(window) >= chunk_size:
+            yield " ".join(window[:chunk_size])
+            del window[:step]
+    # Trailing (shorter) chunks, same as slicing the whole word list
+    while window:
+        yield " ".join(window[:chunk_size])
+        del window[:step]
+
+
+def chunk_text(text: str, chunk_size: int = 200, overlap: int = 50) -> list:
+    """Text chunking"""
+    return list(iter_chunks([text], chunk_size, overlap))
+
+
+_END = object()
+
+
+def buffered(iterable, maxsize: int, stop: threading.Event = None):
+    """Run an iterator on a background thread, handing items over a bounded queue"""
+    stop = stop or threading.Event()
+    items = queue.Queue(maxsize=maxsize)
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((_END, None))
+        except Exception as e:
+            put((_END, e))
+
+    threading.Thread(target=produce, daemon=True).start()
+    while not stop.is_set():
+        try:
+            item, error = items.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if error is not None:
+            raise error
+        if item is _END:
+            return
+        yield item
+
+
+class IngestJob:
+    """Streaming ingestion (pages -> chunks -> embedding batches) on a background thread"""
+
+    def __init__(self, key: str, data: bytes, embed_batch, chunk_size: int = 200, overlap: int = 50,
+                 max_batch_tokens: int = MAX_REQUEST_TOKENS, max_batch_items: int = MAX_REQUEST_ITEMS,
+                 count_tokens=None, max_workers: int = None, queue_size: int = 4, concurrency: int = 4,
+                 max_retries: int = 5, tracer=None):
+        self.key = key
+        self.page_count = len(PdfReader(io.BytesIO(data)).pages)
+        self.pages = []
+        self.docs = []
+        self.embedded = 0
+        self.pending = 0  # Chunks without vectors (waiting for retry or given up)
+        self.failed = 0   # Chunks that exhausted their retries
+        self.done = False
+        self.error = None
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.extract_seconds = None  # Wall time until the last page was extracted
+        self.chunk_seconds = 0.0     # Time spent in the chunker itself (page waits excluded)
+        self._page_wait_seconds = 0.0
+        self._data = data
+        self._embed_batch = embed_batch
+        self._chunk_size = chunk_size
+        self._overlap = overlap
+        self._max_batch_tokens = max_batch_tokens
+        self._max_batch_items = max_batch_items
+        self._count_tokens = count_tokens or make_token_counter()
+        self._max_workers = max_workers
+        self._queue_size = queue_size
+        self._concurrency = concurrency
+        self._max_retries = max_retries
+        self._tracer = tracer  # Receives extract/chunk/ingest timings once the job finishes
+        self._blocks = []       # One vector block per batch, None while pending
+        self._block_sizes = []
+        self._retries = []      # Heap of (due time, seq, attempt, block index, batch)
+        self._retry_seq = itertools.count()
+        self._matrix = None
+        self._pending_mask = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "IngestJob":
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._stop.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the job finishes (True) or timeout seconds pass (False)"""
+        self._thread.join(timeout)
+        return self.done
+
+    def _collect_pages(self, pages):
+        for page_text in pages:
+            self.pages.append(page_text)
+            yield page_text
+        self.extract_seconds = time.monotonic() - self.started_at
+
+    def _timed(self, iterable, attr: str):
+        """Add the time spent producing each item to self.<attr>"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                setattr(self, attr, getattr(self, attr) + time.perf_counter() - start)
+            yield item
+
+    def _collect_docs(self, batches):
+        for batch in batches:
+            # Chunks become searchable (keyword-only) before their vectors arrive
+            with self._lock:
+                self.docs.extend(batch)
+            yield batch
+
+    def _run(self):
+        try:
+            pages = buffered(self._collect_pages(iter_pdf_pages(self._data, self._max_workers)),
+                             self._queue_size, self._stop)
+            pages = self._timed(pages, "_page_wait_seconds")
+            chunks = self._timed(iter_chunks(pages, self._chunk_size, self._overlap), "chunk_seconds")
+            batches = pack_batches(chunks, self._count_tokens, self._max_batch_tokens, self._max_batch_items)
+            batches = buffered(batches, self._queue_size, self._stop)
+            # Several embedding requests in flight; blocks are appended in chunk order
+            for batch, result in embed_concurrently(self._collect_docs(batches), self._try_embed, self._concurrency):
+                with self._lock:
+                    block_index = len(self._blocks)
+                    self._block_sizes.append(len(batch))
+                    if isinstance(result, Exception):
+                        self._blocks.append(None)
+                        self.pending += len(batch)
+                    else:
+                        self._blocks.append(result)
+                        self.embedded += len(batch)
+                    self._matrix = None
+                if isinstance(result, Exception):
+                    self._schedule_retry(block_index, batch, 0, result)
+                self._run_retries(wait=False)
+            self._run_retries(wait=True)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.chunk_seconds = max(0.0, self.chunk_seconds - self._page_wait_seconds)
+            stopped = self._stop.is_set()
+            self._stop.set()
+            self.finished_at = time.monotonic()
+            if self._tracer is not None and self.error is None and not stopped:
+                self._tracer.record("extract", self.extract_seconds * 1000)
+                self._tracer.record("chunk", self.chunk_seconds * 1000)
+                self._tracer.record("ingest", (self.finished_at - self.started_at) * 1000)
+            self.done = True
+
+    def _try_embed(self, batch):
+        try:
+            return self._embed_batch(batch)
+        except Exception as e:
+            return e
+
+    def _schedule_retry(self, block_index: int, batch: list, attempt: int, error: Exception):
+        if attempt >= self._max_retries:
+            self.failed += len(batch)
+            return
+        due = time.monotonic() + backoff_delay(attempt, retry_after_seconds(error))
+        heapq.heappush(self._retries, (due, next(self._retry_seq), attempt, block_index, batch))
+
+    def _run_retries(self, wait: bool):
+        """Re-send failed batches whose backoff has elapsed (wait=True drains the queue)"""
+        while self._retries and not self._stop.is_set():
+            due, _, attempt, block_index, batch = self._retries[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                if not wait:
+                    return
+                self._stop.wait(delay)
+                continue
+            heapq.heappop(self._retries)
+            result = self._try_embed(batch)
+            if isinstance(result, Exception):
+                self._schedule_retry(block_index, batch, attempt + 1, result)
+                continue
+            with self._lock:
+                self._blocks[block_index] = result
+                self.embedded += len(batch)
+                self.pending -= len(batch)
+                self._matrix = None
+
+    def _assemble(self):
+        known = [block for block in self._blocks if block is not None]
+        if not known:
+            return None, None
+        dim = known[0].shape[1]
+        parts = [
+            block if block is not None else np.zeros((size, dim), dtype=known[0].dtype)
+            for block, size in zip(self._blocks, self._block_sizes)
+        ]
+        matrix = np.ascontiguousarray(np.vstack(parts))
+        if not self.pending:
+            return matrix, None
+        mask = np.concatenate([np.full(size, block is None) for block, size in zip(self._blocks, self._block_sizes)])
+        return matrix, mask
+
+    def snapshot(self):
+        """Current chunks, the embedding matrix for the processed prefix and its pending-row mask"""
+        with self._lock:
+            if self._matrix is None:
+                self._matrix, self._pending_mask = self._assemble()
+            return list(self.docs), self._matrix, self._pending_mask
+
+    def embedding_rate(self) -> float:
+        """Measured embedding throughput in chunks per second"""
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return self.embedded / elapsed if elapsed > 0 else 0.0
+
+    def pdf_pages(self) -> PdfPages:
+        return PdfPages(list(self.pages))
@@ -0,0 +1,328 @@
+import math
+import re
+import time
+from collections import Counter
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+")
+
+PRECISIONS = ("float32", "float16", "int8")
+# Reciprocal rank fusion damping constant (Cormack et al.)
+RRF_K = 60
+# Rows upcast to float32 at a time while scoring (bounded, cache-friendly scratch buffer)
+SCORE_BLOCK_ROWS = 1024
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word tokens"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring (postings, lengths and IDF built at ingestion)"""
+
+    def __init__(self, docs: list = None, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths = np.empty(0, dtype=np.float32)
+        self.postings = {}  # term -> (doc ids, term frequencies)
+        self.idf = {}
+        self.avg_length = 0.0
+        self._length_norm = np.empty(0, dtype=np.float32)
+        if docs:
+            self.add(docs)
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, docs: list):
+        """Index more documents (ids continue from the current size)"""
+        if not docs:
+            return
+        first_id = len(self)
+        new_postings = {}
+        lengths = []
+        for doc_id, doc in enumerate(docs, first_id):
+            terms = tokenize(doc)
+            lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                ids, tfs = new_postings.setdefault(term, ([], []))
+                ids.append(doc_id)
+                tfs.append(tf)
+
+        for term, (ids, tfs) in new_postings.items():
+            ids = np.asarray(ids, dtype=np.int32)
+            tfs = np.asarray(tfs, dtype=np.float32)
+            if term in self.postings:
+                old_ids, old_tfs = self.postings[term]
+                ids = np.concatenate([old_ids, ids])
+                tfs = np.concatenate([old_tfs, tfs])
+            self.postings[term] = (ids, tfs)
+
+        self.doc_lengths = np.concatenate([self.doc_lengths, np.asarray(lengths, dtype=np.float32)])
+        self.avg_length = float(self.doc_lengths.mean()) or 1.0
+        self._length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / self.avg_length)
+        doc_count = len(self)
+        self.idf = {
+            term: math.log(1 + (doc_count - len(ids) + 0.5) / (len(ids) + 0.5))
+            for term, (ids, _) in self.postings.items()
+        }
+
+    def search(self, query: str, k: int):
+        """Top-k (doc ids, scores), best first; only query-term posting lists are visited"""
+        matched_ids = []
+        matched_scores = []
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            ids, tfs = self.postings[term]
+            matched_ids.append(ids)
+            matched_scores.append(self.idf[term] * tfs * (self.k1 + 1) / (tfs + self._length_norm[ids]))
+        if not matched_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        # Sum per-term contributions for each matched document
+        doc_ids, inverse = np.unique(np.concatenate(matched_ids), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(matched_scores)).astype(np.float32)
+        best = top_k_indices(totals, k)
+        return doc_ids[best].astype(np.int64), totals[best]
+
+
+class VectorIndex:
+    """Contiguous embedding matrix at float32, float16 or int8 (per-row scale) precision
+
+    float16 halves memory but is the slowest to score: numpy's half-to-float32
+    conversion costs more than the dot products (int8 is both smaller and faster).
+    """
+
+    def __init__(self, vectors: np.ndarray, precision: str = "int8", pending: np.ndarray = None):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unsupported precision: {precision} (choose from {', '.join(PRECISIONS)})")
+        matrix = np.asarray(vectors, dtype=np.float32)
+        self.precision = precision
+        self.pending = pending  # Rows still waiting for their vectors (excluded from scoring)
+        if precision == "int8":
+            # Symmetric scalar quantization: row ~= data * scale
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self.data = np.ascontiguousarray(np.rint(matrix / scales[:, None]), dtype=np.int8)
+            self.scales = scales.astype(np.float32)
+        else:
+            self.data = np.ascontiguousarray(matrix, dtype=precision)
+            self.scales = None
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.data.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Dot-product scores of a normalized query against every row"""
+        query = np.asarray(query, dtype=np.float32)
+        if self.precision == "float32":
+            scores = self.data @ query
+        else:
+            scores = np.empty(len(self), dtype=np.float32)
+            scratch = np.empty((min(SCORE_BLOCK_ROWS, len(self)), self.dim), dtype=np.float32)
+            for start in range(0, len(self), SCORE_BLOCK_ROWS):
+                block = self.data[start:start + SCORE_BLOCK_ROWS]
+                upcast = scratch[:len(block)]
+                upcast[...] = block
+                np.matmul(upcast, query, out=scores[start:start + len(block)])
+            if self.scales is not None:
+                scores *= self.scales
+        if self.pending is not None:
+            scores[self.pending] = -np.inf
+        return scores
+
+    def search(self, query: np.ndarray, k: int):
+        """Top-k (indices, scores), best first; pending rows are never returned"""
+        scores = self.scores(query)
+        indices = top_k_indices(scores, k)
+        indices = indices[np.isfinite(scores[indices])]
+        return indices, scores[indices]
+
+
+def reciprocal_rank_fusion(rankings: dict, k: int = RRF_K) -> list:
+    """Fuse ranked id lists: score(d) = sum over rankings of 1 / (k + rank)"""
+    fused = {}
+    for name, ids in rankings.items():
+        for rank, doc_id in enumerate(ids, 1):
+            entry = fused.setdefault(int(doc_id), {"score": 0.0, "ranks": {}})
+            entry["score"] += 1.0 / (k + rank)
+            entry["ranks"][name] = rank
+    return sorted(fused.items(), key=lambda item: item[1]["score"], reverse=True)
+
+
+def hybrid_search(question: str, docs: list, vector_index: VectorIndex = None, lexical: BM25Index = None,
+                  embed_query=None, top_k: int = 3, candidates: int = 20, rrf_k: int = RRF_K) -> dict:
+    """Vector top-k and BM25 top-k fused with reciprocal rank fusion, with per-stage timings (ms)"""
+    timings = {}
+    rankings = {}
+
+    if vector_index is not None and len(vector_index) > 0 and embed_query is not None:
+        start = time.perf_counter()
+        try:
+            query_vector = embed_query(question)
+        except Exception:
+            query_vector = None
+        timings["embed_query"] = (time.perf_counter() - start) * 1000
+        if query_vector is not None:
+            start = time.perf_counter()
+            rankings["vector"], _ = vector_index.search(query_vector, candidates)
+            timings["vector"] = (time.perf_counter() - start) * 1000
+
+    if lexical is not None and len(lexical) > 0:
+        start = time.perf_counter()
+        rankings["lexical"], _ = lexical.search(question, candidates)
+        timings["lexical"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    fused = reciprocal_rank_fusion(rankings, rrf_k)[:top_k]
+    results = [
+        {"index": doc_id, "text": docs[doc_id], "score": entry["score"], "ranks": entry["ranks"]}
+        for doc_id, entry in fused
+        if doc_id < len(docs)
+    ]
+    timings["fusion"] = (time.perf_counter() - start) * 1000
+    return {"results": results, "timings": timings}
+
+
+class IVFIndex:
+    """Approximate nearest-neighbour index: spherical k-means lists, exact scoring inside probed lists"""
+
+    def __init__(self, n_lists: int = None, n_probe: int = 8, train_min_rows: int = 1024,
+                 retrain_growth: float = 4.0, kmeans_iters: int = 10, seed: int = 0):
+        self.n_lists = n_lists      # Defaults to ~sqrt(rows) at training time
+        self.n_probe = n_probe      # Lists scanned per query: higher = better recall, slower
+        self.train_min_rows = train_min_rows
+        self.retrain_growth = retrain_growth
+        self.kmeans_iters = kmeans_iters
+        self.centroids = None
+        self._rng = np.random.default_rng(seed)
+        self._data = np.empty((0, 0), dtype=np.float32)
+        self._size = 0
+        self._lists = []            # Per list: row-id arrays (merged lazily)
+        self._trained_size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._data[:self._size]
+
+    def add(self, vectors: np.ndarray):
+        """Insert normalized vectors (row ids continue from the current size)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) == 0:
+            return
+        if self._size + len(vectors) > len(self._data):
+            # Grow the backing matrix geometrically so inserts stay amortized O(1)
+            capacity = max(self._size + len(vectors), 2 * len(self._data), 1024)
+            grown = np.empty((capacity, vectors.shape[1]), dtype=np.float32)
+            if self._size:
+                grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        start = self._size
+        self._data[start:start + len(vectors)] = vectors
+        self._size += len(vectors)
+
+        if self.centroids is None:
+            if self._size >= self.train_min_rows:
+                self.train()
+        elif self._size >= self._trained_size * self.retrain_growth:
+            self.train()
+        else:
+            self._assign_rows(start, self._size)
+
+    def train(self):
+        """(Re)build coarse centroids with spherical k-means and reassign every row"""
+        data = self.vectors
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(data))))
+        n_lists = min(n_lists, len(data))
+        sample = data[self._rng.choice(len(data), size=min(len(data), n_lists * 64), replace=False)]
+        centroids = sample[self._rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(self.kmeans_iters):
+            labels = self._nearest(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=n_lists)
+            empty = counts == 0
+            if empty.any():
+                # Re-seed empty lists from random sample rows
+                sums[empty] = sample[self._rng.choice(len(sample), size=int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = sums / norms
+        self.centroids = centroids.astype(np.float32)
+        self._lists = [[] for _ in range(n_lists)]
+        self._trained_size = len(data)
+        self._assign_rows(0, len(data))
+
+    @staticmethod
+    def _nearest(rows: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        labels = np.empty(len(rows), dtype=np.int64)
+        for start in range(0, len(rows), SCORE_BLOCK_ROWS):
+            labels[start:start + SCORE_BLOCK_ROWS] = np.argmax(rows[start:start + SCORE_BLOCK_ROWS] @ centroids.T, axis=1)
+        return labels
+
+    def _assign_rows(self, start: int, stop: int):
+        labels = self._nearest(self._data[start:stop], self.centroids)
+        order = np.argsort(labels, kind="stable")
+        boundaries = np.searchsorted(labels[order], np.arange(len(self._lists) + 1))
+        for list_id in range(len(self._lists)):
+            members = order[boundaries[list_id]:boundaries[list_id + 1]]
+            if len(members):
+                self._lists[list_id].append(members + start)
+
+    def _list_ids(self, list_id: int) -> np.ndarray:
+        parts = self._lists[list_id]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        if len(parts) > 1:
+            parts[:] = [np.concatenate(parts)]
+        return parts[0]
+
+    def search(self, query: np.ndarray, k: int, n_probe: int = None):
+        """Approximate top-k (indices, scores), best first (exact until trained)"""
+        query = np.asarray(query, dtype=np.float32)
+        if self._size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if self.centroids is None:
+            candidates = np.arange(self._size)
+        else:
+            probe = min(n_probe or self.n_probe, len(self.centroids))
+            lists = top_k_indices(self.centroids @ query, probe)
+            candidates = np.concatenate([self._list_ids(list_id) for list_id in lists])
+        scores = self._data[candidates] @ query
+        best = top_k_indices(scores, k)
+        return candidates[best], scores[best]
+
+
+def recall_at_k(approx_index, exact_index, queries: np.ndarray, k: int = 10) -> float:
+    """Mean fraction of the exact top-k that the approximate index also returns"""
+    hits = 0
+    for query in queries:
+        exact_ids, _ = exact_index.search(query, k)
+        approx_ids, _ = approx_index.search(query, k)
+        hits += len(np.intersect1d(exact_ids, approx_ids))
+    return hits / (len(queries) * k) if len(queries) else 0.0
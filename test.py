@@ -6,6 +6,8 @@ import time
 from typing import Optional
 import os
 
+from gpt_oss import build_messages, get_gpt_oss_client
+
 # Page settings
 st.set_page_config(
     page_title="GPT-OSS Test",
@@ -40,29 +42,18 @@ if 'OPENAI_API_KEY' in api_keys:
 else:
     client = None
 
+# Local GPT-OSS server client (GPT_OSS_BASE_URL, default http://localhost:8000/v1)
+gpt_oss_client = get_gpt_oss_client()
+
 # New GPT-OSS API call function
 def call_gpt_oss_api_new(user_question: str, context: str = "") -> str:
     """New GPT-OSS API call function"""
     try:
-        if not client:
-            return "OpenAI API key is not configured."
-        
         # Simple prompt
-        prompt = user_question
-        
-        # OpenAI API call
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant. Answer questions directly and accurately."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1000,
-            temperature=0.7
-        )
+        messages = build_messages(user_question, context, system="You are a helpful assistant. Answer questions directly and accurately.")
         
-        # Actual AI response
-        ai_response = response.choices[0].message.content.strip()
+        # GPT-OSS server call
+        ai_response = gpt_oss_client.chat(messages, "gpt-oss-20b", max_tokens=1000, temperature=0.7).strip()
         
         # New formatting
         formatted_response = f"""**New GPT-OSS Answer**
@@ -0,0 +1,369 @@
+import json
+import os
+import re
+import threading
+from collections import Counter, deque
+from itertools import compress
+
+TOKEN_RE = re.compile(r"\w+")
+LEXICON_FILE = os.getenv("LEXICON_FILE")  # Optional JSON file of extra keywords (see below)
+TOPIC_PREFIX = "topic:"  # Topic lexicons share the matcher under prefixed names
+
+# Lexicons matched as whole words/phrases, case-insensitively
+LEXICONS = {
+    "complex": [
+        "analyze", "compare", "evaluate", "strategy", "approach", "solution", "alternative", "pros and cons",
+        "why", "how", "which", "most", "optimal", "efficient", "effective", "impact",
+        "relationship", "correlation", "difference", "similar", "characteristic", "advantage", "disadvantage"
+    ],
+    "simple": [
+        "definition", "explain", "what", "where", "when", "who", "concept",
+        "meaning", "term", "basic", "simple", "summary", "overview"
+    ],
+    "specific": ['example', 'specifically', 'for instance', 'first', 'second', 'third', 'also', 'however', 'therefore'],
+    "uncertain": ["I don't know", 'not sure', 'guess', 'maybe', 'perhaps'],
+    "positive": ['good', 'excellent', 'great', 'useful', 'effective', 'successful'],
+    "negative": ['bad', 'problem', 'failure', 'difficult', 'complex', 'inconvenient'],
+}
+
+TOPIC_LEXICONS = {
+    'Technology': ['programming', 'code', 'algorithm', 'database', 'API', 'development'],
+    'Business': ['management', 'strategy', 'marketing', 'revenue', 'customer', 'service'],
+    'Education': ['learning', 'education', 'lecture', 'course', 'knowledge', 'understanding'],
+    'Medical': ['diagnosis', 'treatment', 'symptom', 'medicine', 'health', 'hospital'],
+    'Legal': ['law', 'contract', 'litigation', 'rights', 'obligation', 'regulation']
+}
+
+# English stop words
+STOP_WORDS = frozenset(['the', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'shall', 'to', 'of', 'in', 'for', 'on', 'with', 'at', 'by', 'from', 'as', 'into', 'through', 'during', 'before', 'after', 'above', 'below', 'between', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why', 'how', 'all', 'each', 'every', 'both', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very', 'and', 'but', 'or', 'if', 'it', 'its', 'this', 'that', 'which', 'what', 'who'])
+
+
+# ASCII fast path: every non-word character becomes a space, then split (same tokens as TOKEN_RE)
+_ASCII_NON_WORD = bytes(i for i in range(128) if not TOKEN_RE.match(chr(i)))
+_ASCII_TO_SPACES = bytes.maketrans(_ASCII_NON_WORD, b" " * len(_ASCII_NON_WORD))
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word tokens"""
+    lowered = text.lower()
+    if lowered.isascii():
+        return lowered.encode("ascii").translate(_ASCII_TO_SPACES).decode("ascii").split()
+    return TOKEN_RE.findall(lowered)
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over word tokens: every lexicon hit in one pass, whole words only"""
+
+    def __init__(self, lexicons: dict):
+        self.patterns = []  # Pattern id -> (lexicon name, entry)
+        self._words = {}    # Single-token patterns: token -> pattern ids (plain lookups, no automaton needed)
+        goto = [{}]
+        outputs = [set()]
+        for name, entries in lexicons.items():
+            for entry in entries:
+                tokens = tokenize(entry)
+                if not tokens:
+                    continue
+                pattern_id = len(self.patterns)
+                self.patterns.append((name, entry))
+                if len(tokens) == 1:
+                    self._words.setdefault(tokens[0], set()).add(pattern_id)
+                    continue
+                state = 0
+                for token in tokens:
+                    if token not in goto[state]:
+                        goto[state][token] = len(goto)
+                        goto.append({})
+                        outputs.append(set())
+                    state = goto[state][token]
+                outputs[state].add(pattern_id)
+
+        # Breadth-first failure links, folded into per-state transition tables so scans never
+        # backtrack; transitions out of the root are kept once in self._root instead of per state
+        self._root = goto[0]
+        fail = [0] * len(goto)
+        self._delta = [{} for _ in goto]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            self._delta[state] = {**self._delta[fail[state]], **goto[state]}
+            for token, child in goto[state].items():
+                if state:
+                    fail[child] = self._delta[fail[state]].get(token) or self._root.get(token, 0)
+                outputs[child] |= outputs[fail[child]]
+                queue.append(child)
+        self._outputs = [frozenset(output) for output in outputs]
+        self._word_set = frozenset(self._words)
+        self._phrase_vocabulary = frozenset().union(*goto)
+
+    def scan(self, tokens: list, words=None) -> dict:
+        """Lexicon name -> entries found (in lexicon order); words is the text's token set if already built"""
+        words = set(tokens) if words is None else words
+        found = set()
+        for token in self._word_set.intersection(words):
+            found |= self._words[token]
+        # No phrase can match unless one of their first tokens occurs
+        if not self._root.keys().isdisjoint(words):
+            found |= self._scan_phrases(tokens)
+        hits = {}
+        for pattern_id in sorted(found):
+            name, entry = self.patterns[pattern_id]
+            hits.setdefault(name, []).append(entry)
+        return hits
+
+    def _scan_phrases(self, tokens: list) -> set:
+        root, delta, outputs = self._root, self._delta, self._outputs
+        found = set()
+        state = 0
+        previous = -2
+        # Tokens outside every phrase send the automaton back to the root, so only
+        # phrase tokens are stepped through (a gap restarts from the root)
+        for position, token in compress(enumerate(tokens), map(self._phrase_vocabulary.__contains__, tokens)):
+            if position != previous + 1:
+                state = 0
+            previous = position
+            state = delta[state].get(token) or root.get(token, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return found
+
+
+def _all_lexicons() -> dict:
+    return {**LEXICONS, **{TOPIC_PREFIX + topic: keywords for topic, keywords in TOPIC_LEXICONS.items()}}
+
+
+def _extend(lexicon: list, keywords) -> None:
+    for keyword in keywords:
+        if keyword not in lexicon:
+            lexicon.append(keyword)
+
+
+def add_keywords(lexicon: str, keywords) -> None:
+    """Extend (or create) an analyzer lexicon, e.g. add_keywords("positive", ["helpful"])"""
+    global _matcher
+    with _matcher_lock:
+        _extend(LEXICONS.setdefault(lexicon, []), keywords)
+        _matcher = KeywordMatcher(_all_lexicons())
+
+
+def add_topic_keywords(topic: str, keywords) -> None:
+    """Extend (or create) a topic for classify_topic"""
+    global _matcher
+    with _matcher_lock:
+        _extend(TOPIC_LEXICONS.setdefault(topic, []), keywords)
+        _matcher = KeywordMatcher(_all_lexicons())
+
+
+# Extra keywords from a JSON file: {"lexicons": {"positive": [...]}, "topics": {"Finance": [...]}}
+if LEXICON_FILE:
+    with open(LEXICON_FILE, encoding="utf-8") as f:
+        _extra = json.load(f)
+    for _name, _keywords in _extra.get("lexicons", {}).items():
+        _extend(LEXICONS.setdefault(_name, []), _keywords)
+    for _name, _keywords in _extra.get("topics", {}).items():
+        _extend(TOPIC_LEXICONS.setdefault(_name, []), _keywords)
+
+# Compiled once at import; extending a lexicon swaps in a recompiled matcher
+_matcher = KeywordMatcher(_all_lexicons())
+_matcher_lock = threading.Lock()
+
+
+class AnalyzedText:
+    """Text tokenized and lowercased once; every analyzer reads from this"""
+
+    def __init__(self, text: str):
+        self.text = text or ""
+        self.tokens = tokenize(self.text)
+        self.counts = Counter(self.tokens)
+        self.words = self.counts.keys()
+        self._hits = None
+
+    def __len__(self):
+        return len(self.text)
+
+    def hits(self, lexicon: str) -> list:
+        """Entries of the named lexicon present in the text as whole words/phrases"""
+        if self._hits is None:
+            # First lookup finds the hits of every lexicon in one scan
+            self._hits = _matcher.scan(self.tokens, self.words)
+        return self._hits.get(lexicon, [])
+
+    def topic_hits(self, topic: str) -> list:
+        return self.hits(TOPIC_PREFIX + topic)
+
+
+def analyzed(text) -> AnalyzedText:
+    """AnalyzedText for text (passed through if it already is one)"""
+    return text if isinstance(text, AnalyzedText) else AnalyzedText(text)
+
+
+def analyze_question_complexity(question) -> dict:
+    """Analyze question complexity"""
+    question = analyzed(question)
+    complex_hits = question.hits("complex")
+    simple_hits = question.hits("simple")
+    complexity_score = 2 * len(complex_hits) - len(simple_hits)
+
+    # Consider question length
+    if len(question) > 50:
+        complexity_score += 1
+    if len(question) > 100:
+        complexity_score += 2
+
+    # Determine question type
+    question_type = "basic"
+    if complexity_score >= 4:
+        question_type = "complex"
+    elif complexity_score >= 2:
+        question_type = "medium"
+
+    return {
+        "score": complexity_score,
+        "type": question_type,
+        "complex_keywords": complex_hits,
+        "simple_keywords": simple_hits
+    }
+
+
+def analyze_answer_quality(answer, question) -> dict:
+    """Analyze answer quality"""
+    answer = analyzed(answer)
+    if len(answer.text.strip()) < 10:
+        return {'score': 0, 'issues': ['Answer is too short'], 'level': 'bad'}
+    question = analyzed(question)
+
+    score = 0
+    issues = []
+
+    # 1. Length score (max 25 points)
+    length_score = min(len(answer) / 100, 25)
+    score += length_score
+
+    # 2. Specificity score (max 25 points)
+    specificity_count = len(answer.hits("specific"))
+    specificity_score = min(specificity_count * 5, 25)
+    score += specificity_score
+
+    # 3. Uncertainty reduction score (max 25 points)
+    uncertainty_count = len(answer.hits("uncertain"))
+    uncertainty_score = max(0, 25 - uncertainty_count * 5)
+    score += uncertainty_score
+
+    # 4. Keyword inclusion score (max 25 points)
+    keyword_overlap = len(question.words & answer.words)
+    keyword_score = min(keyword_overlap * 3, 25)
+    score += keyword_score
+
+    # Issue identification
+    if length_score < 10:
+        issues.append('Answer is too short')
+    if specificity_score < 10:
+        issues.append('Lacks specific examples')
+    if uncertainty_score < 15:
+        issues.append('Too many uncertain expressions')
+    if keyword_score < 10:
+        issues.append('Low relevance to question')
+
+    # Determine level
+    if score >= 80:
+        level = 'good'
+    elif score >= 60:
+        level = 'medium'
+    else:
+        level = 'bad'
+
+    return {
+        'score': round(score, 1),
+        'issues': issues,
+        'level': level
+    }
+
+
+def analyze_sentiment_and_tone(text) -> dict:
+    """Sentiment and tone analysis"""
+    try:
+        text = analyzed(text)
+        positive_count = len(text.hits("positive"))
+        negative_count = len(text.hits("negative"))
+
+        if positive_count > negative_count:
+            sentiment = "Positive"
+            tone = "Friendly and encouraging"
+        elif negative_count > positive_count:
+            sentiment = "Negative"
+            tone = "Concerned and cautious"
+        else:
+            sentiment = "Neutral"
+            tone = "Objective and balanced"
+
+        return {
+            'sentiment': sentiment,
+            'tone': tone,
+            'positive_score': positive_count,
+            'negative_score': negative_count
+        }
+    except Exception as e:
+        return {'sentiment': 'Unable to analyze', 'tone': 'Unable to analyze', 'positive_score': 0, 'negative_score': 0}
+
+
+def classify_topic(text) -> str:
+    """Topic classification"""
+    try:
+        text = analyzed(text)
+        topic_scores = {topic: len(text.topic_hits(topic)) for topic in TOPIC_LEXICONS}
+
+        if topic_scores:
+            best_topic = max(topic_scores, key=topic_scores.get)
+            return best_topic if topic_scores[best_topic] > 0 else "General"
+        else:
+            return "General"
+    except Exception as e:
+        return "General"
+
+
+def improve_math_readability(text: str) -> str:
+    """Improve math symbol readability"""
+    try:
+        # Convert LaTeX formulas to plain text
+        math_replacements = {
+            r'\frac{([^}]+)}{([^}]+)}': r'fraction(\1/\2)',
+            r'\sqrt{([^}]+)}': r'sqrt(\1)',
+            r'\sum_{([^}]+)}': r'sum(\1)',
+            r'\int_{([^}]+)}': r'integral(\1)',
+            r'\alpha': 'alpha',
+            r'\beta': 'beta',
+            r'\gamma': 'gamma',
+            r'\delta': 'delta',
+            r'\epsilon': 'epsilon',
+            r'\theta': 'theta',
+            r'\lambda': 'lambda',
+            r'\mu': 'mu',
+            r'\pi': 'pi',
+            r'\sigma': 'sigma',
+            r'\phi': 'phi',
+            r'\omega': 'omega'
+        }
+
+        improved_text = text
+        for pattern, replacement in math_replacements.items():
+            improved_text = re.sub(pattern, replacement, improved_text)
+
+        return improved_text
+    except Exception as e:
+        return text
+
+
+def analyze_text_keywords(text, top_n: int = 20) -> dict:
+    """Analyze keywords from text"""
+    try:
+        text = analyzed(text)
+        # Token counts minus stop words and single characters
+        word_counts = Counter({
+            word: count for word, count in text.counts.items()
+            if word not in STOP_WORDS and len(word) > 1
+        })
+
+        # Return top keywords
+        return dict(word_counts.most_common(top_n))
+    except Exception as e:
+        return {}
@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class Tracer:
+    """Ring buffer of timed stage records (also forwarded to a parent tracer)"""
+
+    def __init__(self, capacity: int = 1024, parent: "Tracer" = None):
+        self.parent = parent
+        self._records = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def record(self, stage: str, duration_ms: float, tokens: int = None, cache_hit=None):
+        """Add one call (cache_hit: True/False, or the hit fraction of a batched lookup)"""
+        entry = {"stage": stage, "ms": duration_ms, "tokens": tokens, "cache_hit": cache_hit, "at": time.time()}
+        with self._lock:
+            self._records.append(entry)
+        if self.parent is not None:
+            self.parent.record(stage, duration_ms, tokens, cache_hit)
+
+    @contextmanager
+    def span(self, stage: str, **attrs):
+        """Time a block; set attrs["tokens"] / attrs["cache_hit"] inside it to record them"""
+        start = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self.record(stage, (time.perf_counter() - start) * 1000, attrs.get("tokens"), attrs.get("cache_hit"))
+
+    def records(self) -> list:
+        with self._lock:
+            return list(self._records)
+
+    def summary(self) -> list:
+        """Per-stage count, p50/p95/max milliseconds, tokens and cache hit rate"""
+        stages = {}
+        for entry in self.records():
+            stages.setdefault(entry["stage"], []).append(entry)
+        rows = []
+        for stage, entries in sorted(stages.items()):
+            durations = np.array([entry["ms"] for entry in entries])
+            lookups = [entry["cache_hit"] for entry in entries if entry["cache_hit"] is not None]
+            tokens = [entry["tokens"] for entry in entries if entry["tokens"] is not None]
+            rows.append({
+                "stage": stage,
+                "calls": len(entries),
+                "p50 ms": round(float(np.percentile(durations, 50)), 1),
+                "p95 ms": round(float(np.percentile(durations, 95)), 1),
+                "max ms": round(float(durations.max()), 1),
+                "tokens": sum(tokens) if tokens else None,
+                "cache hit %": round(100 * sum(lookups) / len(lookups)) if lookups else None,
+            })
+        return rows
+
+
+# Shared by every session of this process (outlives Streamlit reruns)
+PROCESS_TRACER = Tracer(capacity=8192)